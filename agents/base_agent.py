@@ -3,18 +3,33 @@
 Module définissant la classe de base pour tous les agents
 """
 import abc
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Any
+import re
+from typing import Dict, Any, List, Optional, AsyncIterator
 
+from config import settings
 from llm.llm_connector import LLMConnector
+from utils.semantic_cache import get_semantic_cache
 
 logger = logging.getLogger(__name__)
 
+# Bloc de code Python dans une réponse du LLM
+CODE_BLOCK_RE = re.compile(r"```python\s*(.*?)\s*```", re.DOTALL)
+
 class BaseAgent(abc.ABC):
     """
     Agent de base définissant l'interface commune pour tous les agents spécialisés
     """
     
+    # Appels au LLM en cours, partagés par les requêtes identiques simultanées
+    _inflight: Dict[str, asyncio.Future] = {}
+    
+    # Si True, une réponse en cache n'est réutilisée que pour des données identiques;
+    # sinon des données proches (au sens du modèle d'embedding) suffisent
+    exact_cache: bool = True
+    
     def __init__(self, llm_connector: LLMConnector):
         """
         Initialise l'agent avec un connecteur LLM
@@ -25,6 +40,10 @@ class BaseAgent(abc.ABC):
         self.llm_connector = llm_connector
         self.name = "BaseAgent"
         self.description = "Agent générique"
+        # Paramètres transmis à llm_connector.generate (max_tokens, temperature, system_message...)
+        self.generation_params: Dict[str, Any] = {}
+        # Cache sémantique partagé entre les agents (None si désactivé)
+        self.semantic_cache = get_semantic_cache()
     
     @abc.abstractmethod
     async def process(self, data: Dict[str, Any]) -> Dict[str, Any]:
@@ -39,14 +58,311 @@ class BaseAgent(abc.ABC):
         """
         pass
     
-    def check_status(self) -> bool:
+    async def process_batch(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Traite plusieurs requêtes en lançant les appels au LLM en parallèle
+        
+        Args:
+            batch: Liste de données, chacune au format attendu par process
+            
+        Returns:
+            Liste des résultats, dans le même ordre que les données fournies
+        """
+        responses: List[Optional[Dict[str, Any]]] = [None] * len(batch)
+        calls = {}
+        
+        for i, data in enumerate(batch):
+            try:
+                early_response = self._validate(data)
+                if early_response is not None:
+                    responses[i] = early_response
+                    continue
+                
+                prompt = self._build_prompt(data)
+                calls[i] = self._cached_generate(
+                    prompt, self._cache_key(data), self._cache_scope(data), **self.generation_params
+                )
+            except Exception as e:
+                responses[i] = self._handle_error(e, data)
+        
+        # Les appels au LLM se recouvrent au lieu d'être sérialisés
+        results = await asyncio.gather(*calls.values(), return_exceptions=True)
+        
+        for i, result in zip(calls, results):
+            data = batch[i]
+            try:
+                if isinstance(result, BaseException):
+                    raise result
+                responses[i] = self._postprocess(result, data)
+            except Exception as e:
+                responses[i] = self._handle_error(e, data)
+        
+        return responses
+    
+    async def process_stream(self, data: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Traite une requête en transmettant la réponse du LLM au fil de sa génération
+        
+        Args:
+            data: Données nécessaires pour la tâche
+            
+        Yields:
+            {"delta": texte} pour chaque fragment généré, puis {"result": résultat}
+            avec le résultat final, identique à celui de process
+        """
+        try:
+            early_response = self._validate(data)
+            if early_response is not None:
+                yield {"result": early_response}
+                return
+            
+            prompt = self._build_prompt(data)
+            
+            chunks = []
+            async for chunk in self._cached_stream(
+                prompt, self._cache_key(data), self._cache_scope(data), **self.generation_params
+            ):
+                chunks.append(chunk)
+                yield {"delta": chunk}
+            
+            # L'analyse de la réponse se fait sur le texte complet
+            result = self._postprocess("".join(chunks), data)
+        except Exception as e:
+            result = self._handle_error(e, data)
+        
+        yield {"result": result}
+    
+    async def _cached_generate(
+        self, prompt: str, cache_key: Optional[str], cache_scope: str = "", **kwargs
+    ) -> str:
+        """
+        Appelle le LLM, sauf si une réponse à une requête équivalente est en cache
+        
+        Les appels identiques lancés simultanément sont regroupés: seul le premier
+        interroge le LLM, les suivants attendent son résultat.
+        
+        Args:
+            prompt: Texte d'invite pour le modèle
+            cache_key: Clé de la requête dans le cache (voir _cache_key), None pour ne pas l'utiliser
+            cache_scope: Partie de la requête qui doit être identique pour réutiliser une réponse (voir _cache_scope)
+            **kwargs: Paramètres transmis à llm_connector.generate
+            
+        Returns:
+            Texte généré par le modèle ou récupéré depuis le cache
+        """
+        key = hashlib.blake2b(
+            f"{id(self.llm_connector)}|{sorted(kwargs.items())!r}|{prompt}".encode(),
+            digest_size=16
+        ).hexdigest()
+        
+        # Pas de verrou nécessaire: aucun await entre la lecture et l'écriture du dictionnaire
+        while (inflight := BaseAgent._inflight.get(key)) is not None:
+            logger.info(f"Joining identical in-flight LLM call for {self.name}")
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise  # C'est cette requête-ci qui est annulée
+                # La requête qui portait l'appel a été annulée, pas celle-ci: l'appel
+                # est relancé (ou rejoint s'il a déjà été relancé par une autre requête)
+        
+        future = asyncio.get_running_loop().create_future()
+        BaseAgent._inflight[key] = future
+        
+        try:
+            result = await self._generate_with_cache(prompt, cache_key, cache_scope, **kwargs)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Évite l'avertissement asyncio si personne n'attendait ce résultat
+            raise
+        except BaseException:
+            # Les requêtes en attente relancent l'appel au lieu d'hériter de l'annulation
+            future.cancel()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            BaseAgent._inflight.pop(key, None)
+    
+    async def _generate_with_cache(
+        self, prompt: str, cache_key: Optional[str], cache_scope: str = "", **kwargs
+    ) -> str:
+        """
+        Appelle le LLM en consultant puis en alimentant le cache sémantique
+        """
+        if self.semantic_cache is None or cache_key is None:
+            return await self.llm_connector.generate(prompt, **kwargs)
+        
+        namespace = self._cache_namespace(cache_scope, kwargs)
+        
+        try:
+            cached = await asyncio.to_thread(self.semantic_cache.lookup, cache_key, namespace, self.exact_cache)
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup failed: {str(e)}")
+            cached = None
+        
+        if cached is not None:
+            logger.info(f"Semantic cache hit for {self.name}")
+            return cached
+        
+        result = await self.llm_connector.generate(prompt, **kwargs)
+        
+        if result:
+            try:
+                await asyncio.to_thread(self.semantic_cache.insert, cache_key, result, namespace, self.exact_cache)
+            except Exception as e:
+                logger.warning(f"Semantic cache insertion failed: {str(e)}")
+        
+        return result
+    
+    async def _cached_stream(
+        self, prompt: str, cache_key: Optional[str], cache_scope: str = "", **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        Équivalent de _cached_generate renvoyant la réponse au fil de sa génération
+        
+        Args:
+            prompt: Texte d'invite pour le modèle
+            cache_key: Clé de la requête dans le cache (voir _cache_key), None pour ne pas l'utiliser
+            cache_scope: Partie de la requête qui doit être identique pour réutiliser une réponse (voir _cache_scope)
+            **kwargs: Paramètres transmis à llm_connector.astream
+            
+        Yields:
+            Fragments du texte généré, ou la réponse en cache en un seul fragment
+        """
+        if self.semantic_cache is None or cache_key is None:
+            async for chunk in self.llm_connector.astream(prompt, **kwargs):
+                yield chunk
+            return
+        
+        namespace = self._cache_namespace(cache_scope, kwargs)
+        
+        try:
+            cached = await asyncio.to_thread(self.semantic_cache.lookup, cache_key, namespace, self.exact_cache)
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup failed: {str(e)}")
+            cached = None
+        
+        if cached is not None:
+            logger.info(f"Semantic cache hit for {self.name}")
+            yield cached
+            return
+        
+        chunks = []
+        async for chunk in self.llm_connector.astream(prompt, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        
+        result = "".join(chunks)
+        if result:
+            try:
+                await asyncio.to_thread(self.semantic_cache.insert, cache_key, result, namespace, self.exact_cache)
+            except Exception as e:
+                logger.warning(f"Semantic cache insertion failed: {str(e)}")
+    
+    def _cache_namespace(self, cache_scope: str, kwargs: Dict[str, Any]) -> str:
+        """
+        Identifie l'agent, le modèle, les paramètres de génération et la portée d'un appel:
+        une réponse en cache n'est réutilisée que pour un appel identique sur ces points
+        """
+        return (
+            f"{self.name}|{type(self.llm_connector).__name__}|"
+            f"{getattr(self.llm_connector, 'model_name', '')}|{sorted(kwargs.items())!r}|{cache_scope!r}"
+        )
+    
+    def _cache_key(self, data: Dict[str, Any]) -> Optional[str]:
+        """
+        Construit la clé d'une requête dans le cache des réponses
+        
+        La clé ne contient que les données fournies par l'utilisateur: les consignes
+        fixes du prompt, identiques d'une requête à l'autre, ne doivent pas servir à
+        comparer deux requêtes.
+        
+        Returns:
+            La clé de la requête, ou None si les réponses de l'agent ne sont pas mises en cache
+        """
+        return None
+    
+    def _cache_scope(self, data: Dict[str, Any]) -> str:
+        """
+        Partie de la requête qui doit être identique pour réutiliser une réponse en cache
+        
+        Elle est ajoutée à l'espace de noms de l'entrée: même lorsque les clés sont
+        comparées par similarité, deux requêtes de portées différentes ne partagent
+        jamais de réponse.
+        
+        Returns:
+            La portée de la requête, vide par défaut
+        """
+        return ""
+    
+    def _validate(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Vérifie les données avant l'appel au LLM
+        
+        Returns:
+            Une réponse d'erreur si les données sont invalides, None sinon
+        """
+        return None
+    
+    def _truncate_input(self, text: str) -> str:
+        """
+        Tronque une entrée trop longue pour tenir dans le contexte du modèle
+        
+        Args:
+            text: Texte fourni par l'utilisateur
+            
+        Returns:
+            Le texte, limité à settings.MAX_INPUT_CHARS caractères
+        """
+        if len(text) <= settings.MAX_INPUT_CHARS:
+            return text
+        
+        logger.warning(f"{self.name}: input truncated from {len(text)} to {settings.MAX_INPUT_CHARS} characters")
+        return text[:settings.MAX_INPUT_CHARS]
+    
+    @abc.abstractmethod
+    def _build_prompt(self, data: Dict[str, Any]) -> Any:
+        """
+        Construit le prompt envoyé au LLM à partir des données de la requête
+        """
+        pass
+    
+    @abc.abstractmethod
+    def _postprocess(self, result: Any, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Transforme la réponse brute du LLM en résultat de l'agent
+        """
+        pass
+    
+    def _handle_error(self, error: Exception, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Construit la réponse renvoyée lorsqu'une requête du lot échoue
+        """
+        logger.error(f"Error in {self.name}: {str(error)}")
+        return {
+            "success": False,
+            "message": f"Erreur lors du traitement: {str(error)}"
+        }
+    
+    def cached_status_ok(self) -> bool:
+        """
+        Indique, sans appel réseau, si le modèle LLM était disponible lors d'un contrôle récent
+        
+        Returns:
+            True si un contrôle récent du modèle a réussi, False sinon
+        """
+        return self.llm_connector.cached_status_ok()
+    
+    async def check_status(self) -> bool:
         """
         Vérifie si l'agent est opérationnel (vérification du modèle LLM)
         
         Returns:
             True si l'agent est prêt à traiter des requêtes, False sinon
         """
-        return self.llm_connector.check_status()
+        return await self.llm_connector.check_status()
     
     def get_info(self) -> Dict[str, str]:
         """
@@ -1,29 +1,74 @@
 """
 Agent spécialisé dans l'assistance et amélioration de code Python
 """
+import json
 import logging
-from typing import Dict, Any
+from types import MappingProxyType
+from typing import Dict, Any, Optional
 
-from agents.base_agent import BaseAgent
+from agents.base_agent import BaseAgent, CODE_BLOCK_RE
+from agents.debug_assistant import DebugAssistant
+from config import settings
 from llm.llm_connector import LLMConnector
 
 logger = logging.getLogger(__name__)
 
+_TASK_DESCRIPTIONS = MappingProxyType({
+    "correction": "Corrige les erreurs dans le code tout en préservant sa fonctionnalité originale.",
+    "optimisation": "Optimise le code pour améliorer ses performances (vitesse d'exécution, utilisation de la mémoire).",
+    "refactoring": "Réorganise le code pour améliorer sa lisibilité et sa maintenabilité sans changer son comportement.",
+    "pep8": "Modifie le code pour respecter les conventions de style PEP 8 de Python.",
+    "debug": "Identifie les problèmes potentiels dans le code et propose des solutions."
+})
+_DEFAULT_TASK = "Améliore le code Python fourni."
+_EMPTY_REQ = "Aucune exigence spécifique."
+
+def _build_task_prefix(task_desc: str) -> str:
+    """
+    Construit la partie fixe du prompt d'amélioration pour une tâche donnée
+    """
+    return f"""En tant qu'expert Python, ta tâche est de: {task_desc}
+
+Instructions:
+1. Analyse attentivement le code fourni
+2. {task_desc}
+3. Fournis le code amélioré
+4. Explique les modifications importantes que tu as apportées
+
+Réponds uniquement en JSON, avec un objet de la forme {{"code": "<code amélioré>", "explanation": "<explication claire des modifications>"}}.
+"""
+
+# Préfixes calculés une seule fois par type de tâche
+_TASK_PREFIXES = MappingProxyType({
+    task_type: _build_task_prefix(task_desc)
+    for task_type, task_desc in _TASK_DESCRIPTIONS.items()
+})
+_DEFAULT_PREFIX = _build_task_prefix(_DEFAULT_TASK)
+
 class CodeAssistant(BaseAgent):
     """
     Agent spécialisé dans l'amélioration, correction et optimisation du code Python
     """
     
-    def __init__(self, llm_connector: LLMConnector):
+    def __init__(self, llm_connector: LLMConnector, debug_assistant: Optional[DebugAssistant] = None):
         """
         Initialise l'assistant de code
         
         Args:
             llm_connector: Connecteur vers le modèle de langage à utiliser
+            debug_assistant: Assistant de debug auquel déléguer les rapports de debug
+                (créé à partir du même connecteur s'il n'est pas fourni)
         """
         super().__init__(llm_connector)
+        self.debug_assistant = debug_assistant or DebugAssistant(llm_connector)
         self.name = "CodeAssistant"
         self.description = "Agent spécialisé dans l'amélioration et le débogage de code Python"
+        self.generation_params = {
+            "max_tokens": 2048,
+            "temperature": 0.2,  # Température basse pour des réponses précises et cohérentes
+            "system_message": "Tu es un expert en Python qui excelle dans l'amélioration et l'optimisation de code.",
+            "response_format": {"type": "json_object"}
+        }
     
     async def process(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -39,51 +84,74 @@ class CodeAssistant(BaseAgent):
         Returns:
             Dictionnaire contenant le code amélioré et des métadonnées
         """
-        try:
-            code = data.get('code', '')
-            task_type = data.get('task_type', 'correction')
-            requirements = data.get('requirements', [])
-            context = data.get('context', '')
-            
-            if not code:
-                return {
-                    "improved_code": "",
-                    "explanation": "Aucun code fourni à améliorer.",
-                    "success": False,
-                    "message": "Erreur: code manquant"
-                }
-            
-            logger.info(f"Processing code improvement task: {task_type}")
-            
-            # Construction du prompt selon le type de tâche
-            prompt = self._build_code_prompt(code, task_type, requirements, context)
-            
-            # Appel au LLM
-            result = await self.llm_connector.generate(
-                prompt,
-                max_tokens=2048,
-                temperature=0.2,  # Température basse pour des réponses précises et cohérentes
-                system_message="Tu es un expert en Python qui excelle dans l'amélioration et l'optimisation de code."
-            )
-            
-            # Extraction du code et des explications de la réponse
-            improved_code, explanation = self._parse_llm_response(result)
-            
-            return {
-                "improved_code": improved_code,
-                "explanation": explanation,
-                "success": True,
-                "message": f"Code {task_type} effectué avec succès"
-            }
-        
-        except Exception as e:
-            logger.error(f"Error in code improvement: {str(e)}")
+        return (await self.process_batch([data]))[0]
+    
+    def _validate(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Vérifie qu'un code à améliorer a bien été fourni
+        """
+        if not data.get('code', ''):
             return {
                 "improved_code": "",
-                "explanation": "",
+                "explanation": "Aucun code fourni à améliorer.",
                 "success": False,
-                "message": f"Erreur lors de l'amélioration du code: {str(e)}"
+                "message": "Erreur: code manquant"
             }
+        return None
+    
+    def _build_prompt(self, data: Dict[str, Any]) -> str:
+        """
+        Construit le prompt d'amélioration à partir des données de la requête
+        """
+        task_type = data.get('task_type', 'correction')
+        logger.info(f"Processing code improvement task: {task_type}")
+        
+        return self._build_code_prompt(
+            self._truncate_input(data.get('code', '')),
+            task_type,
+            data.get('requirements', []),
+            data.get('context', '')
+        )
+    
+    def _cache_key(self, data: Dict[str, Any]) -> Optional[str]:
+        """
+        Clé de cache de la requête: le code et les consignes de l'utilisateur
+        """
+        return json.dumps([
+            data.get('task_type', 'correction'),
+            data.get('code', ''),
+            data.get('requirements', []),
+            data.get('context', '')
+        ], ensure_ascii=False)
+    
+    def _postprocess(self, result: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Extrait le code et les explications de la réponse du LLM
+        """
+        improved_code, explanation = self._parse_llm_response(result)
+        message = f"Code {data.get('task_type', 'correction')} effectué avec succès"
+        
+        if len(data.get('code', '')) > settings.MAX_INPUT_CHARS:
+            message += f" (code tronqué à {settings.MAX_INPUT_CHARS} caractères)"
+        
+        return {
+            "improved_code": improved_code,
+            "explanation": explanation,
+            "success": True,
+            "message": message
+        }
+    
+    def _handle_error(self, error: Exception, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Construit la réponse en cas d'échec de l'amélioration
+        """
+        logger.error(f"Error in code improvement: {str(error)}")
+        return {
+            "improved_code": "",
+            "explanation": "",
+            "success": False,
+            "message": f"Erreur lors de l'amélioration du code: {str(error)}"
+        }
     
     async def generate_debug_report(self, code: str, error_message: str = None) -> Dict[str, Any]:
         """
@@ -96,46 +164,10 @@ class CodeAssistant(BaseAgent):
         Returns:
             Dictionnaire contenant le rapport de debug et des métadonnées
         """
-        try:
-            if not code:
-                return {
-                    "debug_report": "",
-                    "fixed_code": "",
-                    "success": False,
-                    "message": "Aucun code fourni à déboguer"
-                }
-            
-            logger.info("Generating debug report")
-            
-            # Construction du prompt pour le debug
-            prompt = self._build_debug_prompt(code, error_message)
-            
-            # Appel au LLM
-            result = await self.llm_connector.generate(
-                prompt,
-                max_tokens=2048,
-                temperature=0.3,
-                system_message="Tu es un expert en débogage Python capable d'identifier et de résoudre rapidement les problèmes complexes."
-            )
-            
-            # Parse the response to extract the debug report and fixed code
-            debug_report, fixed_code = self._parse_debug_response(result)
-            
-            return {
-                "debug_report": debug_report,
-                "fixed_code": fixed_code,
-                "success": True,
-                "message": "Rapport de debug généré avec succès"
-            }
-            
-        except Exception as e:
-            logger.error(f"Error generating debug report: {str(e)}")
-            return {
-                "debug_report": "",
-                "fixed_code": "",
-                "success": False,
-                "message": f"Erreur lors de la génération du rapport de debug: {str(e)}"
-            }
+        return await self.debug_assistant.process({
+            "code": code,
+            "error_message": error_message
+        })
 
     def _build_code_prompt(
         self, 
@@ -147,60 +179,23 @@ class CodeAssistant(BaseAgent):
         """
         Construit un prompt pour l'amélioration de code
         """
-        task_descriptions = {
-            "correction": "Corrige les erreurs dans le code tout en préservant sa fonctionnalité originale.",
-            "optimisation": "Optimise le code pour améliorer ses performances (vitesse d'exécution, utilisation de la mémoire).",
-            "refactoring": "Réorganise le code pour améliorer sa lisibilité et sa maintenabilité sans changer son comportement.",
-            "pep8": "Modifie le code pour respecter les conventions de style PEP 8 de Python.",
-            "debug": "Identifie les problèmes potentiels dans le code et propose des solutions."
-        }
-        
-        task_desc = task_descriptions.get(task_type, "Améliore le code Python fourni.")
-        req_str = "\n".join([f"- {req}" for req in requirements]) if requirements else "Aucune exigence spécifique."
+        prefix = _TASK_PREFIXES.get(task_type, _DEFAULT_PREFIX)
+        req_str = "\n".join(f"- {req}" for req in requirements) or _EMPTY_REQ
+        context_str = f"\n\nContexte d'utilisation:\n{context}" if context else ""
         
-        return f"""En tant qu'expert Python, ta tâche est de: {task_desc}
-
+        # Les instructions (qui ne dépendent que du type de tâche) sont placées en tête
+        # du prompt et les données de l'utilisateur à la fin, pour que le préfixe
+        # reste identique d'un appel à l'autre et profite du cache de prompt du fournisseur.
+        # Le cache des réponses n'utilise pas ce prompt mais _cache_key, qui ne contient
+        # que les données de l'utilisateur
+        return f"""{prefix}
 Code Python à améliorer:
 ```python
 {code}
 ```
 
 Exigences spécifiques:
-{req_str}
-
-{"Contexte d'utilisation:\n" + context if context else ""}
-
-Instructions:
-1. Analyse attentivement le code fourni
-2. {task_desc}
-3. Fournis le code amélioré
-4. Explique les modifications importantes que tu as apportées
-
-Réponds en fournissant d'abord le code amélioré encadré par ```python et ```, puis une explication claire des modifications.
-"""
-
-    def _build_debug_prompt(self, code: str, error_message: str = None) -> str:
-        """
-        Construit un prompt pour le débogage
-        """
-        error_context = f"\nLe code génère l'erreur suivante:\n```\n{error_message}\n```" if error_message else ""
-        
-        return f"""En tant qu'expert en débogage Python, analyse ce code et identifie ses problèmes:
-
-```python
-{code}
-```
-{error_context}
-
-Instructions:
-1. Analyse le code et identifie tous les problèmes (erreurs de syntaxe, bugs logiques, inefficacités, etc.)
-2. Explique chaque problème identifié et pourquoi il pose problème
-3. Propose une solution correcte pour chaque problème
-4. Fournis une version corrigée et améliorée du code
-
-Réponds avec:
-1. Un rapport de débogage détaillé expliquant les problèmes
-2. Le code corrigé entre balises ```python et ```
+{req_str}{context_str}
 """
 
     def _parse_llm_response(self, response: str) -> tuple:
@@ -213,11 +208,15 @@ Réponds avec:
         Returns:
             Tuple contenant (code amélioré, explication)
         """
-        # Recherche le code entre les marqueurs de bloc de code Python
-        import re
+        try:
+            data = json.loads(response)
+            return data["code"], data.get("explanation", "")
+        except (ValueError, KeyError, TypeError, AttributeError):
+            # Le modèle n'a pas respecté le format JSON demandé
+            pass
         
-        code_pattern = re.compile(r"```python\s*(.*?)\s*```", re.DOTALL)
-        code_match = code_pattern.search(response)
+        # Recherche le code entre les marqueurs de bloc de code Python
+        code_match = CODE_BLOCK_RE.search(response)
         
         if code_match:
             improved_code = code_match.group(1).strip()
@@ -232,28 +231,3 @@ Réponds avec:
         
         # Fallback: s'il n'y a pas de bloc de code correctement formaté
         return response, ""
-    
-    def _parse_debug_response(self, response: str) -> tuple:
-        """
-        Extrait le rapport de debug et le code corrigé d'une réponse LLM
-        """
-        import re
-        
-        # Recherche le code entre les marqueurs de bloc de code Python
-        code_pattern = re.compile(r"```python\s*(.*?)\s*```", re.DOTALL)
-        code_match = code_pattern.search(response)
-        
-        if code_match:
-            fixed_code = code_match.group(1).strip()
-            
-            # Le rapport de debug est tout ce qui précède le bloc de code
-            debug_report = response[:code_match.start()].strip()
-            
-            # Si le rapport est vide, prendre tout ce qui suit le bloc de code
-            if not debug_report:
-                debug_report = response[code_match.end():].strip()
-                
-            return debug_report, fixed_code
-        
-        # S'il n'y a pas de bloc de code, considérer la réponse entière comme un rapport
-        return response, ""
@@ -1,10 +1,12 @@
 """
 Agent spécialisé dans la génération de rapports de debug contextuels
 """
+import json
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
-from agents.base_agent import BaseAgent
+from agents.base_agent import BaseAgent, CODE_BLOCK_RE
+from config import settings
 from llm.llm_connector import LLMConnector
 
 logger = logging.getLogger(__name__)
@@ -25,6 +27,12 @@ class DebugAssistant(BaseAgent):
         super().__init__(llm_connector)
         self.name = "DebugAssistant"
         self.description = "Agent spécialisé dans l'analyse et le débogage de code Python"
+        self.generation_params = {
+            "max_tokens": 2048,
+            "temperature": 0.2,  # Température basse pour des analyses précises
+            "system_message": "Tu es un expert en débogage de code Python avec une expérience approfondie dans l'analyse et la résolution de problèmes complexes.",
+            "response_format": {"type": "json_object"}
+        }
     
     async def process(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -39,59 +47,131 @@ class DebugAssistant(BaseAgent):
         Returns:
             Dictionnaire contenant le rapport de debug et des métadonnées
         """
-        try:
-            code = data.get('code', '')
-            error_message = data.get('error_message', '')
-            context = data.get('context', '')
-            
-            if not code:
-                return {
-                    "debug_report": "",
-                    "success": False,
-                    "message": "Aucun code fourni à analyser."
-                }
-            
-            logger.info(f"Generating debug report for Python code")
-            
-            # Construction du prompt
-            prompt = self._build_debug_prompt(code, error_message, context)
-            
-            # Appel au LLM
-            result = await self.llm_connector.generate(
-                prompt,
-                max_tokens=2048,
-                temperature=0.2,  # Température basse pour des analyses précises
-                system_message="Tu es un expert en débogage de code Python avec une expérience approfondie dans l'analyse et la résolution de problèmes complexes."
-            )
-            
-            return {
-                "debug_report": result,
-                "success": True,
-                "message": "Rapport de debug généré avec succès"
-            }
-            
-        except Exception as e:
-            logger.error(f"Error generating debug report: {str(e)}")
+        return (await self.process_batch([data]))[0]
+    
+    def _validate(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Vérifie qu'un code à analyser a bien été fourni
+        """
+        if not data.get('code', ''):
             return {
                 "debug_report": "",
+                "fixed_code": "",
                 "success": False,
-                "message": f"Erreur lors de la génération du rapport de debug: {str(e)}"
+                "message": "Aucun code fourni à analyser."
             }
+        return None
+    
+    def _build_prompt(self, data: Dict[str, Any]) -> str:
+        """
+        Construit le prompt de debug à partir des données de la requête
+        """
+        logger.info(f"Generating debug report for Python code")
+        
+        return self._build_debug_prompt(
+            self._truncate_input(data.get('code', '')),
+            data.get('error_message', ''),
+            data.get('context', '')
+        )
+    
+    def _cache_key(self, data: Dict[str, Any]) -> Optional[str]:
+        """
+        Clé de cache de la requête: le code, le message d'erreur et le contexte
+        """
+        return json.dumps([
+            data.get('code', ''),
+            data.get('error_message') or '',
+            data.get('context') or ''
+        ], ensure_ascii=False)
+    
+    def _postprocess(self, result: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Extrait le rapport de debug et le code corrigé de la réponse du LLM
+        """
+        debug_report, fixed_code = self._parse_debug_response(result)
+        message = "Rapport de debug généré avec succès"
+        
+        if len(data.get('code', '')) > settings.MAX_INPUT_CHARS:
+            message += f" (code tronqué à {settings.MAX_INPUT_CHARS} caractères)"
+        
+        return {
+            "debug_report": debug_report,
+            "fixed_code": fixed_code,
+            "success": True,
+            "message": message
+        }
+    
+    def _handle_error(self, error: Exception, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Construit la réponse en cas d'échec de la génération du rapport
+        """
+        logger.error(f"Error generating debug report: {str(error)}")
+        return {
+            "debug_report": "",
+            "fixed_code": "",
+            "success": False,
+            "message": f"Erreur lors de la génération du rapport de debug: {str(error)}"
+        }
 
     def _build_debug_prompt(self, code: str, error_message: str, context: str) -> str:
         """
         Construit un prompt pour la génération du rapport de debug
+        
+        Les consignes fixes sont placées en tête et les données de l'utilisateur à la
+        fin; le cache des réponses compare les requêtes sur _cache_key, pas sur ce prompt.
         """
         error_context = f"\nMessage d'erreur rapporté:\n```\n{error_message}\n```" if error_message else ""
         execution_context = f"\nContexte d'exécution:\n{context}" if context else ""
         
-        return f"""Tu es un expert en débogage de code Python avec une expérience approfondie dans l'analyse et la résolution de problèmes complexes.
+        return f"""En tant qu'expert en débogage Python, analyse le code fourni ci-dessous et identifie ses problèmes.
 
-Je te présente un code Python qui pose problème et nécessite une analyse approfondie :
-```
+Instructions:
+1. Analyse le code et identifie tous les problèmes (erreurs de syntaxe, bugs logiques, inefficacités, etc.)
+2. Explique chaque problème identifié et pourquoi il pose problème
+3. Propose une solution correcte pour chaque problème
+4. Fournis une version corrigée et améliorée du code
+
+Réponds uniquement en JSON, avec un objet de la forme {{"debug_report": "<rapport de débogage détaillé expliquant les problèmes>", "fixed_code": "<code corrigé>"}}.
+
+Code à analyser:
+```python
 {code}
 ```
 {error_context}
 {execution_context}
 """
 
+    def _parse_debug_response(self, response: str) -> tuple:
+        """
+        Extrait le rapport de debug et le code corrigé d'une réponse LLM
+        
+        Args:
+            response: Texte brut de la réponse du modèle
+            
+        Returns:
+            Tuple contenant (rapport de debug, code corrigé)
+        """
+        try:
+            data = json.loads(response)
+            return data["debug_report"], data.get("fixed_code", "")
+        except (ValueError, KeyError, TypeError, AttributeError):
+            # Le modèle n'a pas respecté le format JSON demandé
+            pass
+        
+        # Recherche le code entre les marqueurs de bloc de code Python
+        code_match = CODE_BLOCK_RE.search(response)
+        
+        if code_match:
+            fixed_code = code_match.group(1).strip()
+            
+            # Le rapport de debug est tout ce qui précède le bloc de code
+            debug_report = response[:code_match.start()].strip()
+            
+            # Si le rapport est vide, prendre tout ce qui suit le bloc de code
+            if not debug_report:
+                debug_report = response[code_match.end():].strip()
+                
+            return debug_report, fixed_code
+        
+        # S'il n'y a pas de bloc de code, considérer la réponse entière comme un rapport
+        return response, ""
@@ -1,36 +1,93 @@
 """
 Agent for Retrieval-Augmented Generation (RAG) using Docling for document processing
 """
+import asyncio
+import inspect
 import logging
 import os
-from typing import Dict, Any, List, Optional
+import uuid
+from pathlib import Path
+from typing import Dict, Any, List, Optional, AsyncIterator, Union
 
+import faiss
+import numpy as np
 import langchain
 from langchain.schema import Document
 from langchain.prompts import PromptTemplate
 from langchain.chains import RetrievalQA
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
 from langchain_groq import ChatGroq
+from docling.datamodel.base_models import DocumentStream
 
 from agents.base_agent import BaseAgent
+from config import settings
+from llm.groq_connector import GroqConnector
 from utils.document_processor import DoclingProcessor
+from utils.embeddings import get_embeddings
 
 logger = logging.getLogger(__name__)
 
+# Number of chunks encoded per forward pass of the embedding model
+EMBED_BATCH_SIZE = 64
+
+# Above this number of chunks, the exhaustive flat index is replaced by IVF-PQ
+IVF_PQ_THRESHOLD = 2000
+IVF_PQ_M = 32  # Number of sub-quantizers (must divide the embedding dimension)
+IVF_PQ_NBITS = 8
+IVF_NPROBE = 16  # Number of clusters visited per query (accuracy/speed trade-off)
+
+# The docstore of a saved index is pickled. Releases of langchain_community that
+# know the opt-in flag refuse to unpickle without it; older ones, like the pinned
+# 0.0.10, pass unknown keyword arguments on to FAISS.__init__ and must not get it
+_LOAD_LOCAL_KWARGS = (
+    {"allow_dangerous_deserialization": True}
+    if "allow_dangerous_deserialization" in inspect.signature(FAISS.load_local).parameters
+    else {}
+)
+
+# RAG prompt
+_PROMPT = PromptTemplate(
+    template="""
+            Tu es un assistant spécialisé en traitement de documents et NLP.
+            Utilise uniquement les informations contextuelles ci-dessous pour répondre à la question.
+            Si les informations ne sont pas suffisantes, dis simplement que tu ne sais pas.
+
+            Informations contextuelles:
+            {context}
+
+            Question: {question}
+
+            Ta réponse (sois précis et détaillé):
+            """,
+    input_variables=["context", "question"]
+)
+
+def _preview(text: str, length: int = 200) -> str:
+    """
+    Truncate a text for display, adding an ellipsis when it is cut
+    """
+    return text if len(text) <= length else text[:length] + "..."
+
 class RAGAgent(BaseAgent):
     """
     Agent implementing Retrieval-Augmented Generation (RAG) capabilities
     with Docling for document processing
     """
     
-    def __init__(self, llm_connector=None, groq_api_key: str = None):
+    def __init__(
+        self,
+        llm_connector=None,
+        groq_api_key: str = None,
+        doc_processor: Optional[DoclingProcessor] = None
+    ):
         """
         Initialize the RAG agent
         
         Args:
             llm_connector: LLM connector to use (optional)
             groq_api_key: API key for Groq (if not using llm_connector)
+            doc_processor: Shared Docling processor (a new one is built if not provided)
         """
         super().__init__(llm_connector)
         self.name = "RAGAgent"
@@ -38,14 +95,19 @@ class RAGAgent(BaseAgent):
         
         # Setup RAG components
         self.embed_model_id = "sentence-transformers/all-MiniLM-L6-v2"
-        self.embeddings = HuggingFaceEmbeddings(model_name=self.embed_model_id)
+        self.embeddings = get_embeddings(self.embed_model_id)
         self.vectorstore = None
-        self.doc_processor = DoclingProcessor(embed_model_id=self.embed_model_id)
+        self._qa_chain = None  # Built on the first query, reset when the index changes
+        self.doc_processor = doc_processor or DoclingProcessor(embed_model_id=self.embed_model_id)
         
-        # Setup Groq as a fallback if no LLM connector is provided
+        # The RAG chain needs a LangChain chat model with async support: the
+        # ChatGroq client of a Groq connector, or one built from the API key
         self.groq_api_key = groq_api_key or os.environ.get("GROQ_API_KEY")
         
-        if self.groq_api_key and not self.llm_connector:
+        if isinstance(self.llm_connector, GroqConnector):
+            logger.info("Using the Groq connector's chat model for RAG agent")
+            self.llm = self.llm_connector.client
+        elif self.groq_api_key:
             logger.info("Using Groq LLM for RAG agent")
             self.llm = ChatGroq(
                 api_key=self.groq_api_key,
@@ -54,40 +116,103 @@ class RAGAgent(BaseAgent):
                 max_tokens=2048
             )
         else:
-            logger.info("Using provided LLM connector for RAG agent")
-            self.llm = None  # Will use self.llm_connector in process method
+            logger.warning("No Groq connector or API key: RAG queries are unavailable")
+            self.llm = None
+    
+    def cached_status_ok(self) -> bool:
+        """
+        Report, without a network call, whether the agent's LLM was recently available
+        
+        Returns:
+            True if a recent status check succeeded (or the ChatGroq fallback is configured)
+        """
+        if self.llm is None:
+            return False
+        if isinstance(self.llm_connector, GroqConnector):
+            return self.llm_connector.cached_status_ok()
+        return True
+    
+    async def check_status(self) -> bool:
+        """
+        Check whether the agent has a usable LLM
+        
+        Returns:
+            True if the agent is ready to process requests, False otherwise
+        """
+        if self.llm is None:
+            return False
+        if isinstance(self.llm_connector, GroqConnector):
+            return await self.llm_connector.check_status()
+        return True
     
-    async def process_document(self, file_path: str) -> Dict[str, Any]:
+    async def process_batch(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Process several queries concurrently
+        
+        Args:
+            batch: List of dictionaries, each in the format expected by process
+            
+        Returns:
+            List of results, in the same order as the batch
+        """
+        return list(await asyncio.gather(*(self.process(data) for data in batch)))
+    
+    async def process_stream(self, data: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a request with the streaming interface of the other agents
+        
+        The RAG chain returns its answer at once, so the full result is sent
+        as a single event.
+        
+        Args:
+            data: Dictionary in the format expected by process
+            
+        Yields:
+            {"result": result}
+        """
+        yield {"result": await self.process(data)}
+    
+    async def process_document(self, source: Union[str, DocumentStream]) -> Dict[str, Any]:
         """
         Process a document and build a vector index
         
         Args:
-            file_path: Path to the document file
+            source: Path to the document file, or in-memory document stream
             
         Returns:
             Dictionary with processing results and status
         """
         try:
             # Process document with Docling
-            result, chunks = self.doc_processor.process_document(file_path)
+            result, chunks = await asyncio.to_thread(self.doc_processor.process_document, source)
             
-            # Convert chunks to Langchain documents
-            documents = [
-                Document(page_content=chunk, metadata={"source": f"chunk_{i}"})
-                for i, chunk in enumerate(chunks)
-            ]
+            texts = list(chunks)
+            metadatas = [{"source": f"chunk_{i}"} for i in range(len(texts))]
+            
+            # Encode all chunks in large batches, then build the index from the vectors
+            vectors = await asyncio.to_thread(
+                self.embeddings.client.encode,
+                texts,
+                **{
+                    **self.embeddings.encode_kwargs,
+                    "batch_size": EMBED_BATCH_SIZE,
+                    "show_progress_bar": False,
+                    "convert_to_numpy": True
+                }
+            )
             
             # Create vector index
-            self.vectorstore = FAISS.from_documents(documents, self.embeddings)
+            self.vectorstore = await asyncio.to_thread(self._build_vectorstore, texts, vectors, metadatas)
+            self._invalidate_chain()
             
             # Extract images
-            images = self.doc_processor.get_images_from_document(result)
+            images = await asyncio.to_thread(self.doc_processor.get_images_from_document, result)
             
             return {
                 "success": True,
-                "message": f"Document processed successfully: {len(documents)} chunks created",
+                "message": f"Document processed successfully: {len(texts)} chunks created",
                 "document_info": {
-                    "chunks": len(documents),
+                    "chunks": len(texts),
                     "images": len(images)
                 }
             }
@@ -100,12 +225,108 @@ class RAGAgent(BaseAgent):
                 "document_info": None
             }
     
+    def _build_vectorstore(
+        self,
+        texts: List[str],
+        vectors: np.ndarray,
+        metadatas: List[Dict[str, Any]]
+    ) -> FAISS:
+        """
+        Build the FAISS vector store from precomputed embeddings
+        
+        Small corpora use an exact flat L2 index; large ones use a compressed
+        IVF-PQ index so that queries only scan a few clusters.
+        
+        Args:
+            texts: Text of each chunk
+            vectors: Embedding of each chunk
+            metadatas: Metadata of each chunk
+            
+        Returns:
+            LangChain FAISS vector store
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        dim = vectors.shape[1]
+        
+        if len(texts) <= IVF_PQ_THRESHOLD or dim % IVF_PQ_M:
+            return FAISS.from_embeddings(list(zip(texts, vectors)), self.embeddings, metadatas=metadatas)
+        
+        nlist = min(4096, 4 * int(len(vectors) ** 0.5))
+        logger.info(f"Building IVF-PQ index with {nlist} clusters for {len(texts)} chunks")
+        
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, IVF_PQ_M, IVF_PQ_NBITS)
+        index.train(vectors)
+        index.add(vectors)
+        index.nprobe = IVF_NPROBE
+        
+        ids = [str(uuid.uuid4()) for _ in texts]
+        docstore = InMemoryDocstore({
+            doc_id: Document(page_content=text, metadata=metadata)
+            for doc_id, text, metadata in zip(ids, texts, metadatas)
+        })
+        
+        return FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=dict(enumerate(ids))
+        )
+    
+    def _build_prompt(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the input of the RAG chain from a query request
+        """
+        return {"query": data['query']}
+    
+    def _postprocess(self, result: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Turn the output of the RAG chain into the agent's result
+        """
+        # Extract source chunks for reference
+        source_chunks = [
+            {"source": doc.metadata.get("source", "unknown"), "content": _preview(doc.page_content)}
+            for doc in result.get("source_documents", [])
+        ]
+        
+        return {
+            "success": True,
+            "message": "Query processed successfully",
+            "answer": result["result"],
+            "sources": source_chunks
+        }
+    
+    def _resolve_index_path(self, index_path: str) -> Path:
+        """
+        Resolve an index path inside the configured index directory
+        
+        Args:
+            index_path: Path of the index, relative to settings.RAG_INDEX_DIR
+            
+        Returns:
+            Absolute path of the index
+            
+        Raises:
+            ValueError: If the path points outside the index directory
+        """
+        index_dir = settings.RAG_INDEX_DIR.resolve()
+        path = (index_dir / index_path).resolve()
+        if path == index_dir or not path.is_relative_to(index_dir):
+            raise ValueError(f"Index path must be inside the index directory: {index_path}")
+        return path
+    
+    def _invalidate_chain(self) -> None:
+        """
+        Drop the cached RAG chain so that it is rebuilt on the current vector store
+        """
+        self._qa_chain = None
+    
     async def save_index(self, index_path: str) -> Dict[str, Any]:
         """
         Save the current vector index
         
         Args:
-            index_path: Path to save the index
+            index_path: Path to save the index, relative to settings.RAG_INDEX_DIR
             
         Returns:
             Dictionary with operation status
@@ -117,7 +338,8 @@ class RAGAgent(BaseAgent):
                     "message": "No index to save. Process a document first."
                 }
             
-            self.vectorstore.save_local(index_path)
+            path = self._resolve_index_path(index_path)
+            await asyncio.to_thread(self.vectorstore.save_local, str(path))
             return {
                 "success": True,
                 "message": f"Index saved successfully to {index_path}"
@@ -134,13 +356,22 @@ class RAGAgent(BaseAgent):
         Load a saved vector index
         
         Args:
-            index_path: Path to the index
+            index_path: Path to the index, relative to settings.RAG_INDEX_DIR
             
         Returns:
             Dictionary with operation status
         """
         try:
-            self.vectorstore = FAISS.load_local(index_path, self.embeddings)
+            # The docstore is unpickled: the path is confined to the index directory,
+            # where only save_index writes
+            path = self._resolve_index_path(index_path)
+            self.vectorstore = await asyncio.to_thread(
+                FAISS.load_local,
+                str(path),
+                self.embeddings,
+                **_LOAD_LOCAL_KWARGS
+            )
+            self._invalidate_chain()
             return {
                 "success": True,
                 "message": f"Index loaded successfully from {index_path}"
@@ -160,7 +391,8 @@ class RAGAgent(BaseAgent):
             data: Dictionary containing:
                 - query: Question to answer
                 - file_path: Optional path to document to process
-                - index_path: Optional path to load/save index
+                - source: Optional in-memory document stream to process (instead of file_path)
+                - index_path: Optional path to load/save index, relative to settings.RAG_INDEX_DIR
                 - operation: Optional operation ('process', 'save', 'load')
                 
         Returns:
@@ -170,8 +402,8 @@ class RAGAgent(BaseAgent):
             operation = data.get('operation', 'query')
             
             # Handle different operations
-            if operation == 'process' and 'file_path' in data:
-                return await self.process_document(data['file_path'])
+            if operation == 'process' and ('source' in data or 'file_path' in data):
+                return await self.process_document(data.get('source') or data['file_path'])
             
             if operation == 'save' and 'index_path' in data:
                 return await self.save_index(data['index_path'])
@@ -195,54 +427,26 @@ class RAGAgent(BaseAgent):
                     "answer": None
                 }
             
-            # Setup the RAG prompt
-            prompt_template = """
-            Tu es un assistant spécialisé en traitement de documents et NLP.
-            Utilise uniquement les informations contextuelles ci-dessous pour répondre à la question.
-            Si les informations ne sont pas suffisantes, dis simplement que tu ne sais pas.
-
-            Informations contextuelles:
-            {context}
-
-            Question: {question}
-
-            Ta réponse (sois précis et détaillé):
-            """
-            
-            prompt = PromptTemplate(
-                template=prompt_template,
-                input_variables=["context", "question"]
-            )
-            
-            # Use the appropriate LLM
-            llm_to_use = self.llm if self.llm else self.llm_connector
-            
-            # Create and run RAG chain
-            qa_chain = RetrievalQA.from_chain_type(
-                llm=llm_to_use,
-                chain_type="stuff",
-                retriever=self.vectorstore.as_retriever(search_kwargs={"k": 4}),
-                return_source_documents=True,
-                chain_type_kwargs={"prompt": prompt}
-            )
-            
-            result = qa_chain.invoke({"query": query})
+            if self.llm is None:
+                return {
+                    "success": False,
+                    "message": "No LLM available for RAG. Configure a Groq API key.",
+                    "answer": None
+                }
             
-            # Extract source chunks for reference
-            source_chunks = []
-            if "source_documents" in result:
-                for doc in result["source_documents"]:
-                    source_chunks.append({
-                        "source": doc.metadata.get("source", "unknown"),
-                        "content": doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content
-                    })
+            # Build the RAG chain once per vector store
+            if self._qa_chain is None:
+                self._qa_chain = RetrievalQA.from_chain_type(
+                    llm=self.llm,
+                    chain_type="stuff",
+                    retriever=self.vectorstore.as_retriever(search_kwargs={"k": 4}),
+                    return_source_documents=True,
+                    chain_type_kwargs={"prompt": _PROMPT}
+                )
+            qa_chain = self._qa_chain
             
-            return {
-                "success": True,
-                "message": "Query processed successfully",
-                "answer": result["result"],
-                "sources": source_chunks
-            }
+            result = await qa_chain.ainvoke(self._build_prompt(data))
+            return self._postprocess(result, data)
             
         except Exception as e:
             logger.error(f"Error processing RAG query: {str(e)}")
@@ -2,13 +2,40 @@
 Agent spécialisé dans la génération de fichiers README pour les projets
 """
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 from agents.base_agent import BaseAgent
 from llm.llm_connector import LLMConnector
 
 logger = logging.getLogger(__name__)
 
+# Sections incluses par défaut dans le README
+DEFAULT_SECTIONS = [
+    'Introduction', 'Installation', 'Utilisation', 'Fonctionnalités', 
+    'Technologies', 'Structure du projet', 'Contribution', 'Licence'
+]
+
+# Consignes fixes placées en tête de chaque prompt de génération (le cache des
+# réponses compare les requêtes sur _cache_key, sans ces consignes)
+_README_INSTRUCTIONS = """Tu es un expert dans la création de documentation technique, spécialisé dans l'élaboration de README de qualité pour les projets de développement.
+
+Génère un README professionnel, bien structuré et détaillé au format Markdown pour le projet décrit plus bas. 
+Le README doit inclure:
+1. Un en-tête attrayant avec badges pertinents
+2. Une description claire et concise du projet
+3. Des instructions d'installation précises et étape par étape
+4. Des exemples d'utilisation avec du code bien formaté
+5. Une documentation des fonctionnalités principales
+6. La structure du projet si appropriée
+7. Des informations sur la contribution au projet
+8. Des liens vers les ressources connexes
+
+Pour chaque section demandée, assure-toi que le contenu soit pertinent et basé sur les informations fournies.
+Si des informations manquent pour certaines sections, propose un contenu générique mais utile qui pourra être personnalisé ultérieurement.
+
+Réponds uniquement avec le contenu Markdown du README, sans commentaire supplémentaire.
+"""
+
 class ReadmeGenerator(BaseAgent):
     """
     Agent spécialisé dans la génération de fichiers README complets et bien structurés
@@ -23,8 +50,16 @@ class ReadmeGenerator(BaseAgent):
             llm_connector: Connecteur vers le modèle de langage à utiliser
         """
         super().__init__(llm_connector)
+        # Deux descriptions quasi identiques d'un même projet (voir _cache_scope) peuvent
+        # partager leur README
+        self.exact_cache = False
         self.name = "ReadmeGenerator"
         self.description = "Agent spécialisé dans la génération de README pour les projets"
+        self.generation_params = {
+            "max_tokens": 3000,  # Augmenté pour des READMEs plus complets
+            "temperature": 0.7,  # Plus de liberté créative tout en gardant de la structure
+            "system_message": "Tu es un expert en documentation technique qui excelle dans la création de README professionnels."
+        }
 
     async def process(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -44,47 +79,76 @@ class ReadmeGenerator(BaseAgent):
                 - success: Booléen indiquant si la génération s'est bien déroulée
                 - message: Message d'information ou d'erreur
         """
-        try:
-            project_name = data.get('project_name', '')
-            project_description = data.get('project_description', '')
-            code_snippets = data.get('code_snippets', [])
-            technologies = data.get('technologies', [])
-            include_sections = data.get('include_sections', [
-                'Introduction', 'Installation', 'Utilisation', 'Fonctionnalités', 
-                'Technologies', 'Structure du projet', 'Contribution', 'Licence'
-            ])
-            
-            logger.info(f"Generating README for project: {project_name}")
-            
-            # Construction du prompt pour le modèle
-            prompt = self._build_readme_prompt(
-                project_name, 
-                project_description, 
-                code_snippets,
-                technologies,
-                include_sections
-            )
-            
-            # Appel au LLM
-            result = await self.llm_connector.generate(
-                prompt,
-                max_tokens=3000,  # Augmenté pour des READMEs plus complets
-                temperature=0.7,  # Plus de liberté créative tout en gardant de la structure
-                system_message="Tu es un expert en documentation technique qui excelle dans la création de README professionnels."
-            )
-            
-            return {
-                "content": result,
-                "success": True,
-                "message": f"README généré avec succès pour le projet {project_name}"
-            }
-        except Exception as e:
-            logger.error(f"Error generating README: {str(e)}")
+        return (await self.process_batch([data]))[0]
+    
+    def _validate(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Vérifie que le nom et la description du projet ont bien été fournis
+        """
+        if not data.get('project_name') or not data.get('project_description'):
             return {
                 "content": "",
                 "success": False,
-                "message": f"Erreur lors de la génération du README: {str(e)}"
+                "message": "Erreur: le nom et la description du projet sont requis"
             }
+        return None
+    
+    def _build_prompt(self, data: Dict[str, Any]) -> str:
+        """
+        Construit le prompt de génération à partir des données de la requête
+        """
+        project_name = data.get('project_name', '')
+        logger.info(f"Generating README for project: {project_name}")
+        
+        return self._build_readme_prompt(
+            project_name, 
+            data.get('project_description', ''), 
+            data.get('code_snippets', []),
+            data.get('technologies', []),
+            data.get('include_sections', DEFAULT_SECTIONS)
+        )
+    
+    def _cache_key(self, data: Dict[str, Any]) -> Optional[str]:
+        """
+        Clé de cache de la requête: les informations fournies sur le projet, hors son nom
+        
+        Le modèle d'embedding tronque les textes longs: la description du projet est
+        placée en tête pour être toujours prise en compte.
+        """
+        return "\n".join([
+            data.get('project_description', ''),
+            ", ".join(data.get('technologies', [])),
+            ", ".join(data.get('include_sections', DEFAULT_SECTIONS)),
+            *data.get('code_snippets', [])
+        ])
+    
+    def _cache_scope(self, data: Dict[str, Any]) -> str:
+        """
+        Le README cite le nom du projet: seule une requête sur un projet du même nom
+        peut réutiliser une réponse, même si les descriptions se ressemblent
+        """
+        return data.get('project_name', '')
+    
+    def _postprocess(self, result: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Met en forme le README renvoyé par le LLM
+        """
+        return {
+            "content": result,
+            "success": True,
+            "message": f"README généré avec succès pour le projet {data.get('project_name', '')}"
+        }
+    
+    def _handle_error(self, error: Exception, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Construit la réponse en cas d'échec de la génération du README
+        """
+        logger.error(f"Error generating README: {str(error)}")
+        return {
+            "content": "",
+            "success": False,
+            "message": f"Erreur lors de la génération du README: {str(error)}"
+        }
 
     def _build_readme_prompt(
         self, 
@@ -97,18 +161,18 @@ class ReadmeGenerator(BaseAgent):
         """
         Construit un prompt pour la génération du README
         """
-        tech_str = "\n".join([f"- {tech}" for tech in technologies]) if technologies else "Non spécifié"
-        
-        code_str = ""
-        if code_snippets:
-            for i, snippet in enumerate(code_snippets):
-                code_str += f"\nExtrait {i+1}:\n```\n{snippet}\n```\n"
-        
+        tech_str = "\n".join(f"- {tech}" for tech in technologies) if technologies else "Non spécifié"
+        code_str = "".join(
+            f"\nExtrait {i+1}:\n```\n{snippet}\n```\n" for i, snippet in enumerate(code_snippets)
+        )
+        code_section = f"## Extraits de code représentatifs du projet: {code_str}" if code_snippets else ""
         sections_str = ", ".join(include_sections)
         
-        return f"""Tu es un expert dans la création de documentation technique, spécialisé dans l'élaboration de README de qualité pour les projets de développement.
-        
-Je souhaite que tu génères un README complet au format Markdown pour le projet suivant :
+        # Les consignes fixes sont placées en tête du prompt et les informations du
+        # projet à la fin, pour que le préfixe reste identique d'un appel à l'autre
+        return f"""{_README_INSTRUCTIONS}
+## Sections à inclure dans le README
+{sections_str}
 
 ## Informations sur le projet
 - Nom du projet: {project_name}
@@ -116,24 +180,5 @@ Je souhaite que tu génères un README complet au format Markdown pour le projet
 - Technologies utilisées: 
 {tech_str}
 
-{f"## Extraits de code représentatifs du projet: {code_str}" if code_snippets else ""}
-
-## Sections à inclure dans le README
-{sections_str}
-
-Génère un README professionnel, bien structuré et détaillé au format Markdown. 
-Le README doit inclure:
-1. Un en-tête attrayant avec badges pertinents
-2. Une description claire et concise du projet
-3. Des instructions d'installation précises et étape par étape
-4. Des exemples d'utilisation avec du code bien formaté
-5. Une documentation des fonctionnalités principales
-6. La structure du projet si appropriée
-7. Des informations sur la contribution au projet
-8. Des liens vers les ressources connexes
-
-Pour chaque section demandée, assure-toi que le contenu soit pertinent et basé sur les informations fournies.
-Si des informations manquent pour certaines sections, propose un contenu générique mais utile qui pourra être personnalisé ultérieurement.
-
-Réponds uniquement avec le contenu Markdown du README, sans commentaire supplémentaire.
+{code_section}
 """
@@ -2,47 +2,70 @@
 """
 Configuration de l'application
 """
-from pydantic_settings import BaseSettings
+from dataclasses import dataclass
 from pathlib import Path
 import os
 from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+# Charge le fichier .env dans os.environ avant la lecture des paramètres, sauf en
+# production où l'environnement est déjà configuré; les variables déjà définies
+# restent prioritaires
+if os.getenv("PYTHON_ENV", "dev") != "prod":
+    load_dotenv(override=False)
 
-class Settings(BaseSettings):
+@dataclass(frozen=True, slots=True)
+class Settings:
     """
-    Configuration de l'application utilisant Pydantic pour la validation
+    Configuration de l'application, lue une seule fois depuis les variables
+    d'environnement à l'import et non modifiable ensuite
     """
     # Paramètres du serveur
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "8000"))
     DEBUG: bool = os.getenv("DEBUG", "True").lower() == "true"
-    
+    UI_ORIGIN: str = os.getenv("UI_ORIGIN", "http://localhost:7860")  # Origine autorisée par CORS (interface Gradio)
+
     # Paramètres du LLM local
     LLM_TYPE: str = os.getenv("LLM_TYPE", "local")  # "local" ou "api"
     LOCAL_MODEL_PATH: str = os.getenv("LOCAL_MODEL_PATH", "./models/mistral-7b-instruct-v0.1.Q4_K_M.gguf")
     MODEL_TYPE: str = os.getenv("MODEL_TYPE", "mistral")  # "mistral", "llama", etc.
-    
+
     # Paramètres pour Ollama
     OLLAMA_MODEL: str = os.getenv("OLLAMA_MODEL", "mistral")
     OLLAMA_URL: str = os.getenv("OLLAMA_URL", "http://localhost:11434")
-    
+
     # Paramètres pour API externes
     USE_EXTERNAL_API: bool = os.getenv("USE_EXTERNAL_API", "False").lower() == "true"
     GROQ_API_KEY: str = os.getenv("GROQ_API_KEY", "")
-    
+
+    # Paramètres du client HTTP partagé par les connecteurs
+    HTTP_TIMEOUT: float = float(os.getenv("HTTP_TIMEOUT", "60"))
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "1000"))
+    HTTP_MAX_KEEPALIVE: int = int(os.getenv("HTTP_MAX_KEEPALIVE", "100"))
+    LLM_STATUS_TTL: float = float(os.getenv("LLM_STATUS_TTL", "30"))  # Durée de validité d'un contrôle de disponibilité réussi
+
     # Chemins de fichiers et dossiers
     BASE_DIR: Path = Path(__file__).resolve().parent
     LOGS_DIR: Path = BASE_DIR / "logs"
-    
+
     # Paramètres des agents
     MAX_TOKENS: int = int(os.getenv("MAX_TOKENS", "2048"))
     TEMPERATURE: float = float(os.getenv("TEMPERATURE", "0.7"))
-    
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
+    MAX_INPUT_CHARS: int = int(os.getenv("MAX_INPUT_CHARS", "20000"))  # Taille maximale du code envoyé au LLM
+    MAX_UPLOAD_BYTES: int = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))  # Taille maximale d'un document envoyé au RAG
+    RAG_INDEX_DIR: Path = Path(os.getenv("RAG_INDEX_DIR", str(BASE_DIR / "indexes")))  # Seul dossier où le RAG enregistre et charge ses index
+
+    # Paramètres du modèle d'embedding
+    EMBEDDINGS_BACKEND: str = os.getenv("EMBEDDINGS_BACKEND", "onnx")  # "onnx" ou "torch"
+    EMBEDDINGS_ONNX_FILE: str = os.getenv("EMBEDDINGS_ONNX_FILE", "onnx/model_quint8_avx2.onnx")
+
+    # Paramètres du cache sémantique des réponses LLM
+    SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "True").lower() == "true"
+    SEMANTIC_CACHE_PATH: str = os.getenv("SEMANTIC_CACHE_PATH", "semantic_cache.db")
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.15"))
+    SEMANTIC_CACHE_TTL: float = float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+    SEMANTIC_CACHE_MAX_ENTRIES: int = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "10000"))
 
 # Instance unique des paramètres à utiliser dans l'application
-settings = Settings()
\ No newline at end of file
+settings = Settings()
@@ -3,7 +3,7 @@ Module providing a connector for the Groq API
 """
 import os
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator
 
 from langchain_groq import ChatGroq
 from llm.llm_connector import LLMConnector
@@ -43,6 +43,7 @@ class GroqConnector(LLMConnector):
         system_message: str = None,
         temperature: float = 0.7, 
         max_tokens: int = 2048,
+        response_format: Dict[str, Any] = None,
         **kwargs
     ) -> str:
         """
@@ -53,6 +54,7 @@ class GroqConnector(LLMConnector):
             system_message: System message to guide model behavior
             temperature: Temperature to control creativity (0.0-1.0)
             max_tokens: Maximum number of tokens to generate
+            response_format: Format imposed on the response ({"type": "json_object"} for JSON)
             **kwargs: Additional parameters
             
         Returns:
@@ -61,17 +63,15 @@ class GroqConnector(LLMConnector):
         try:
             logger.debug(f"Generating with Groq model {self.model_name}, prompt length: {len(prompt)}")
             
-            # Configure the client with updated parameters
-            self.client.temperature = temperature
-            self.client.max_tokens = max_tokens
+            client = self._bind_client(temperature, max_tokens, response_format)
             
             if system_message:
                 # Langchain ChatGroq uses a different approach for system messages
                 # We need to combine system message and prompt
                 combined_prompt = f"System: {system_message}\n\nUser: {prompt}"
-                response = self.client.invoke(combined_prompt)
+                response = await client.ainvoke(combined_prompt)
             else:
-                response = self.client.invoke(prompt)
+                response = await client.ainvoke(prompt)
             
             return response.content
         
@@ -79,7 +79,63 @@ class GroqConnector(LLMConnector):
             logger.error(f"Error generating with Groq: {str(e)}")
             raise
     
-    async def check_status(self) -> bool:
+    async def astream(
+        self, 
+        prompt: str, 
+        system_message: str = None,
+        temperature: float = 0.7, 
+        max_tokens: int = 2048,
+        response_format: Dict[str, Any] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        Generate a response via Groq, yielding tokens as they arrive
+        
+        Args:
+            prompt: Text prompt for the model
+            system_message: System message to guide model behavior
+            temperature: Temperature to control creativity (0.0-1.0)
+            max_tokens: Maximum number of tokens to generate
+            response_format: Format imposed on the response ({"type": "json_object"} for JSON)
+            **kwargs: Additional parameters
+            
+        Yields:
+            Chunks of the text generated by the model
+        """
+        try:
+            logger.debug(f"Streaming with Groq model {self.model_name}, prompt length: {len(prompt)}")
+            
+            client = self._bind_client(temperature, max_tokens, response_format)
+            
+            if system_message:
+                prompt = f"System: {system_message}\n\nUser: {prompt}"
+            
+            async for chunk in client.astream(prompt):
+                if chunk.content:
+                    yield chunk.content
+        
+        except Exception as e:
+            logger.error(f"Error streaming with Groq: {str(e)}")
+            raise
+    
+    def _bind_client(
+        self,
+        temperature: float,
+        max_tokens: int,
+        response_format: Dict[str, Any] = None
+    ):
+        """
+        Bind the generation parameters to the client for a single call
+        
+        The shared client is not modified, so concurrent calls with different
+        parameters do not interfere.
+        """
+        params = {"temperature": temperature, "max_tokens": max_tokens}
+        if response_format:
+            params["response_format"] = response_format
+        return self.client.bind(**params)
+    
+    async def _probe_status(self) -> bool:
         """
         Check if the Groq API is available
         
@@ -91,7 +147,7 @@ class GroqConnector(LLMConnector):
             
         try:
             # Make a simple request to check if the API is working
-            response = self.client.invoke("Hello")
+            await self.client.ainvoke("Hello")
             return True
         except Exception as e:
             logger.error(f"Error checking Groq status: {str(e)}")
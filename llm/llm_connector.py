@@ -5,12 +5,52 @@ Module pour la connexion avec les différents modèles de langage (LLM)
 import logging
 import os
 import asyncio
-from typing import Dict, Any, Optional, List
+import time
+from typing import Dict, Any, Optional, List, AsyncIterator
 from abc import ABC, abstractmethod
 import httpx
+import orjson
+
+from config import settings
 
 logger = logging.getLogger(__name__)
 
+# Client HTTP partagé par tous les connecteurs, pour réutiliser les connexions keep-alive
+_CLIENT: Optional[httpx.AsyncClient] = None
+_CLIENT_LOCK = asyncio.Lock()
+
+async def get_http_client() -> httpx.AsyncClient:
+    """
+    Renvoie le client HTTP partagé, en le créant au premier appel
+    
+    Returns:
+        Client HTTP asynchrone disposant d'un pool de connexions
+    """
+    global _CLIENT
+    
+    if _CLIENT is None:
+        async with _CLIENT_LOCK:
+            if _CLIENT is None:
+                _CLIENT = httpx.AsyncClient(
+                    timeout=httpx.Timeout(settings.HTTP_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+                    limits=httpx.Limits(
+                        max_connections=settings.HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+                        keepalive_expiry=30.0
+                    )
+                )
+    return _CLIENT
+
+async def close_http_client() -> None:
+    """
+    Ferme le client HTTP partagé et libère ses connexions
+    """
+    global _CLIENT
+    
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+        _CLIENT = None
+
 class LLMConnector(ABC):
     """Classe abstraite définissant l'interface pour tous les connecteurs LLM"""
     
@@ -28,11 +68,62 @@ class LLMConnector(ABC):
         """
         pass
     
-    @abstractmethod
-    def check_status(self) -> bool:
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """
+        Génère une réponse en renvoyant le texte au fur et à mesure de sa génération
+        
+        Par défaut, la réponse complète est renvoyée en un seul fragment; les
+        connecteurs qui le permettent surchargent cette méthode.
+        
+        Args:
+            prompt: Texte d'invite pour le modèle
+            **kwargs: Paramètres supplémentaires spécifiques au modèle
+            
+        Yields:
+            Fragments du texte généré par le modèle
+        """
+        yield await self.generate(prompt, **kwargs)
+    
+    # Instant (time.monotonic) du dernier contrôle de disponibilité réussi
+    _last_ok_ts: Optional[float] = None
+    
+    def cached_status_ok(self) -> bool:
+        """
+        Indique, sans appel réseau, si le modèle était disponible lors d'un contrôle récent
+        
+        Returns:
+            True si un contrôle a réussi il y a moins de LLM_STATUS_TTL secondes
+        """
+        return (
+            self._last_ok_ts is not None
+            and time.monotonic() - self._last_ok_ts < settings.LLM_STATUS_TTL
+        )
+    
+    async def check_status(self, use_cache: bool = True) -> bool:
         """
         Vérifie si le modèle est disponible et fonctionnel
         
+        Un contrôle réussi est mémorisé pendant LLM_STATUS_TTL secondes, ce qui
+        évite un aller-retour réseau à chaque requête.
+        
+        Args:
+            use_cache: Si False, interroge le fournisseur même si un contrôle récent a réussi
+            
+        Returns:
+            True si le modèle est disponible, False sinon
+        """
+        if use_cache and self.cached_status_ok():
+            return True
+        
+        available = await self._probe_status()
+        self._last_ok_ts = time.monotonic() if available else None
+        return available
+    
+    @abstractmethod
+    async def _probe_status(self) -> bool:
+        """
+        Interroge le fournisseur pour savoir si le modèle est disponible
+        
         Returns:
             True si le modèle est disponible, False sinon
         """
@@ -42,25 +133,39 @@ class LLMConnector(ABC):
 class OllamaConnector(LLMConnector):
     """Connecteur pour les modèles de langage via Ollama"""
     
-    def __init__(self, model_name: str = "mistral", base_url: str = "http://localhost:11434"):
+    def __init__(
+        self, 
+        model_name: str = "mistral", 
+        base_url: str = "http://localhost:11434",
+        client: Optional[httpx.AsyncClient] = None
+    ):
         """
         Initialise le connecteur Ollama
         
         Args:
             model_name: Nom du modèle à utiliser (par défaut: "mistral")
             base_url: URL de base pour l'API Ollama
+            client: Client HTTP à utiliser (par défaut: le client partagé du processus),
+                par exemple un client sur httpx.MockTransport pour les tests
         """
         self.model_name = model_name
         self.base_url = base_url
-        self.client = httpx.AsyncClient(timeout=60.0)  # Timeout augmenté pour les grandes générations
+        self._client = client
         logger.info(f"Initialized OllamaConnector with model: {model_name}")
     
+    async def _get_client(self) -> httpx.AsyncClient:
+        """
+        Renvoie le client HTTP fourni à la construction, ou à défaut le client partagé
+        """
+        return self._client or await get_http_client()
+    
     async def generate(
         self, 
         prompt: str, 
         system_message: str = None,
         temperature: float = 0.7, 
         max_tokens: int = 2000,
+        response_format: Optional[Dict[str, Any]] = None,
         **kwargs
     ) -> str:
         """
@@ -71,48 +176,113 @@ class OllamaConnector(LLMConnector):
             system_message: Message système pour guider le comportement du modèle
             temperature: Température pour contrôler la créativité (0.0-1.0)
             max_tokens: Nombre maximum de tokens à générer
+            response_format: Format imposé à la réponse ({"type": "json_object"} pour du JSON)
             **kwargs: Paramètres supplémentaires
             
         Returns:
             Texte généré par le modèle
         """
-        try:
-            logger.debug(f"Generating with Ollama model {self.model_name}, prompt length: {len(prompt)}")
-            
-            payload = {
-                "model": self.model_name,
-                "prompt": prompt,
-                "options": {
-                    "temperature": temperature,
-                    "num_predict": max_tokens
-                }
-            }
-            
-            if system_message:
-                payload["system"] = system_message
-            
-            for key, value in kwargs.items():
-                if key not in ["model", "prompt", "system"]:
-                    if "options" not in payload:
-                        payload["options"] = {}
-                    payload["options"][key] = value
+        logger.debug(f"Generating with Ollama model {self.model_name}, prompt length: {len(prompt)}")
+        
+        # La réponse est lue au fil de l'eau puis assemblée, plutôt que
+        # d'attendre qu'Ollama ait terminé pour analyser un seul gros JSON
+        chunks = [
+            chunk async for chunk in self.astream(
+                prompt, system_message, temperature, max_tokens, response_format, **kwargs
+            )
+        ]
+        return "".join(chunks)
+    
+    async def astream(
+        self, 
+        prompt: str, 
+        system_message: str = None,
+        temperature: float = 0.7, 
+        max_tokens: int = 2000,
+        response_format: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        Génère une réponse via Ollama en renvoyant les tokens au fil de l'eau
+        
+        Args:
+            prompt: Texte d'invite pour le modèle
+            system_message: Message système pour guider le comportement du modèle
+            temperature: Température pour contrôler la créativité (0.0-1.0)
+            max_tokens: Nombre maximum de tokens à générer
+            response_format: Format imposé à la réponse ({"type": "json_object"} pour du JSON)
+            **kwargs: Paramètres supplémentaires
             
-            response = await self.client.post(f"{self.base_url}/api/generate", json=payload)
-            response.raise_for_status()
+        Yields:
+            Fragments du texte généré par le modèle
+        """
+        try:
+            logger.debug(f"Streaming with Ollama model {self.model_name}, prompt length: {len(prompt)}")
             
-            result = response.json()
+            payload = self._build_payload(prompt, system_message, temperature, max_tokens, response_format, **kwargs)
+            payload["stream"] = True
             
-            if "response" in result:
-                return result["response"]
-            else:
-                logger.error(f"Unexpected response format from Ollama: {result}")
-                return ""
+            client = await self._get_client()
+            async with client.stream(
+                "POST",
+                f"{self.base_url}/api/generate",
+                content=orjson.dumps(payload),
+                headers={"content-type": "application/json"}
+            ) as response:
+                response.raise_for_status()
+                
+                # Ollama renvoie un objet JSON par ligne
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    
+                    chunk = orjson.loads(line)
+                    # Une erreur en cours de génération est signalée dans le flux, avec un statut 200
+                    if "error" in chunk:
+                        raise RuntimeError(f"Ollama error: {chunk['error']}")
+                    if chunk.get("response"):
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        break
             
         except Exception as e:
-            logger.error(f"Error generating with Ollama: {str(e)}")
+            logger.error(f"Error streaming with Ollama: {str(e)}")
             raise
     
-    async def check_status(self) -> bool:
+    def _build_payload(
+        self, 
+        prompt: str, 
+        system_message: str,
+        temperature: float, 
+        max_tokens: int,
+        response_format: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Construit le corps de la requête envoyée à l'API Ollama
+        """
+        payload = {
+            "model": self.model_name,
+            "prompt": prompt,
+            "options": {
+                "temperature": temperature,
+                "num_predict": max_tokens
+            }
+        }
+        
+        if system_message:
+            payload["system"] = system_message
+        
+        if response_format and response_format.get("type") == "json_object":
+            payload["format"] = "json"
+        
+        for key, value in kwargs.items():
+            if key not in ["model", "prompt", "system"]:
+                payload["options"][key] = value
+        
+        return payload
+    
+    async def _probe_status(self) -> bool:
         """
         Vérifie si Ollama est disponible et si le modèle est chargé
         
@@ -120,10 +290,11 @@ class OllamaConnector(LLMConnector):
             True si le modèle est disponible, False sinon
         """
         try:
-            response = await self.client.get(f"{self.base_url}/api/tags")
+            client = await self._get_client()
+            response = await client.get(f"{self.base_url}/api/tags")
             response.raise_for_status()
             
-            models = response.json().get("models", [])
+            models = orjson.loads(response.content).get("models", [])
             available_models = [model["name"] for model in models]
             
             if self.model_name in available_models:
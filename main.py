@@ -1,21 +1,29 @@
 """
 Point d'entrée principal pour l'API FastAPI
 """
+import asyncio
+import contextlib
+import io
+import json
 import logging
-import os
+import orjson
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Dict, Any, List, Optional
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict
+from typing import Dict, Any, List, Optional, TYPE_CHECKING
 
 from config import settings
-from llm.llm_connector import OllamaConnector
-from llm.groq_connector import GroqConnector
+from llm.llm_connector import LLMConnector, OllamaConnector, close_http_client
 from orchestrator import Orchestrator
 from agents.readme_generator import ReadmeGenerator
 from agents.code_assistant import CodeAssistant
 from agents.debug_assistant import DebugAssistant
-from agents.rag_agent import RAGAgent
+
+if TYPE_CHECKING:
+    from agents.rag_agent import RAGAgent
 
 # Configuration des logs
 logging.basicConfig(
@@ -24,50 +32,129 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Paramètres lus une seule fois, utilisés par les routes et au démarrage
+OLLAMA_MODEL = settings.OLLAMA_MODEL
+OLLAMA_URL = settings.OLLAMA_URL
+GROQ_KEY = settings.GROQ_API_KEY
+STATUS_TTL = settings.LLM_STATUS_TTL
+MAX_UPLOAD_BYTES = settings.MAX_UPLOAD_BYTES
+UI_ORIGIN = settings.UI_ORIGIN
+
+async def refresh_status(connector: LLMConnector) -> None:
+    """
+    Rafraîchit en tâche de fond l'état de disponibilité d'un connecteur LLM,
+    pour que les requêtes trouvent toujours un contrôle récent en cache
+    """
+    while True:
+        await asyncio.sleep(STATUS_TTL)
+        await connector.check_status(use_cache=False)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Crée les connecteurs LLM et les agents au démarrage, libère le pool HTTP à l'arrêt"""
+    # Initialisation des connecteurs LLM
+    ollama_connector = OllamaConnector(model_name=OLLAMA_MODEL, base_url=OLLAMA_URL)
+    groq_connector = None
+    
+    if GROQ_KEY:
+        from llm.groq_connector import GroqConnector
+        groq_connector = GroqConnector(api_key=GROQ_KEY)
+        logger.info("Groq connector initialized")
+    else:
+        logger.warning("No Groq API key found. Groq-based features will be limited.")
+    
+    # Initialisation de l'orchestrateur et des agents
+    orchestrator = Orchestrator()
+    readme_generator = ReadmeGenerator(ollama_connector)
+    debug_assistant = DebugAssistant(ollama_connector)
+    code_assistant = CodeAssistant(ollama_connector, debug_assistant)
+    
+    # Enregistrement des agents
+    orchestrator.register_agent("readme", readme_generator)
+    orchestrator.register_agent("code", code_assistant)
+    orchestrator.register_agent("debug", debug_assistant)
+    
+    app.state.ollama = ollama_connector
+    app.state.groq = groq_connector
+    app.state.orchestrator = orchestrator
+    app.state.code_assistant = code_assistant
+    # L'agent RAG (Docling, transformers, modèle d'embedding) n'est créé qu'à la
+    # première requête /rag, voir get_rag_agent
+    app.state.rag = None
+    app.state.rag_lock = asyncio.Lock()
+    # Réponse de l'endpoint racine, sérialisée à la première requête, voir root
+    app.state.root_json = None
+    
+    # Contrôle initial de tous les agents, en parallèle: met en cache leur état et
+    # ouvre les connexions du pool avant la première requête
+    statuses = await asyncio.gather(
+        *(agent.check_status() for agent in orchestrator.agents.values()),
+        return_exceptions=True
+    )
+    for agent_id, status in zip(orchestrator.agents, statuses):
+        if status is not True:
+            logger.warning(f"Agent {agent_id} is not available at startup: {status}")
+    
+    status_task = asyncio.create_task(refresh_status(ollama_connector))
+    
+    yield
+    
+    # La tâche est attendue avant de fermer le pool, pour qu'un contrôle en cours
+    # n'utilise pas un client déjà fermé
+    status_task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await status_task
+    
+    # Fermeture du pool de connexions HTTP partagé par les connecteurs
+    await close_http_client()
+
 # Initialisation de l'API
 app = FastAPI(
     title="Agents Python Assistant",
     description="API pour l'assistance au développement Python via des agents spécialisés",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Configuration CORS
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=[UI_ORIGIN],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization"],
+    max_age=86400,  # Les navigateurs réutilisent la réponse au preflight pendant 24 h
 )
 
-# Initialisation des connecteurs LLM
-ollama_connector = OllamaConnector(model_name=settings.OLLAMA_MODEL, base_url=settings.OLLAMA_URL)
-groq_connector = None
+class NoStreamGZipMiddleware:
+    """
+    GZipMiddleware qui laisse passer sans compression les routes de streaming
 
-if settings.GROQ_API_KEY:
-    groq_connector = GroqConnector(api_key=settings.GROQ_API_KEY)
-    logger.info("Groq connector initialized")
-else:
-    logger.warning("No Groq API key found. Groq-based features will be limited.")
+    Le GZipMiddleware de Starlette 0.27 compresse aussi les réponses
+    text/event-stream et les retient dans son tampon: les événements SSE
+    n'arrivaient alors au client qu'en fin de génération.
+    """
 
-# Initialisation de l'orchestrateur et des agents
-orchestrator = Orchestrator()
-readme_generator = ReadmeGenerator(ollama_connector)
-code_assistant = CodeAssistant(ollama_connector)
-debug_assistant = DebugAssistant(ollama_connector)
+    def __init__(self, app, **kwargs):
+        self.app = app
+        self.gzip = GZipMiddleware(app, **kwargs)
 
-# Initialiser l'agent RAG avec le connecteur Groq si disponible
-rag_agent = RAGAgent(groq_connector, settings.GROQ_API_KEY)
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/stream"):
+            await self.app(scope, receive, send)
+        else:
+            await self.gzip(scope, receive, send)
 
-# Enregistrement des agents
-orchestrator.register_agent("readme", readme_generator)
-orchestrator.register_agent("code", code_assistant)
-orchestrator.register_agent("debug", debug_assistant)
-orchestrator.register_agent("rag", rag_agent)
+# Compression des réponses volumineuses (README, réponses RAG); les petites
+# réponses et les flux SSE sont envoyés tels quels
+app.add_middleware(NoStreamGZipMiddleware, minimum_size=1024, compresslevel=5)
 
 # Modèles Pydantic pour la validation des données
 
 class ReadmeRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid", frozen=True)
+    
     project_name: str
     project_description: str
     technologies: List[str] = []
@@ -75,16 +162,22 @@ class ReadmeRequest(BaseModel):
     include_sections: List[str] = []
 
 class CodeRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid", frozen=True)
+    
     code: str
     task_type: str = "correction"  # correction, optimisation, refactoring, pep8, debug
     requirements: List[str] = []
     context: str = ""
 
 class DebugRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid", frozen=True)
+    
     code: str
     error_message: Optional[str] = None
 
 class RAGRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid", frozen=True)
+    
     query: str
     index_path: Optional[str] = None
     operation: Optional[str] = "query"  # query, process, save, load
@@ -94,28 +187,62 @@ class AgentInfoResponse(BaseModel):
     name: str
     description: str
 
+def stream_task(agent_id: str, data: Dict[str, Any]) -> StreamingResponse:
+    """Transmet la réponse d'un agent au fil de sa génération, en Server-Sent Events"""
+    async def events():
+        async for event in app.state.orchestrator.stream_task(agent_id, data):
+            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+async def get_rag_agent() -> "RAGAgent":
+    """Crée l'agent RAG à sa première utilisation et l'enregistre auprès de l'orchestrateur"""
+    if app.state.rag is None:
+        async with app.state.rag_lock:
+            if app.state.rag is None:
+                from agents.rag_agent import RAGAgent
+                from utils.document_processor import DoclingProcessor
+                
+                # Le convertisseur et le chunker Docling sont coûteux à construire: une
+                # seule instance est créée pour toute la durée de vie de l'application
+                app.state.docling = await asyncio.to_thread(DoclingProcessor)
+                app.state.rag = await asyncio.to_thread(
+                    RAGAgent, app.state.groq, GROQ_KEY, doc_processor=app.state.docling
+                )
+                app.state.orchestrator.register_agent("rag", app.state.rag)
+    
+    return app.state.rag
+
 # Endpoints
 
+# Début de la réponse de l'endpoint racine, complété par la liste des agents
+# déjà sérialisée par l'orchestrateur
+ROOT_JSON_PREFIX = orjson.dumps({
+    "message": "Bienvenue sur l'API Agents Python Assistant",
+    "version": "1.0.0",
+    "docs": "/docs"
+})[:-1] + b',"agents":'
+
 @app.get("/")
 async def root():
     """Endpoint racine avec informations sur l'API"""
-    return {
-        "message": "Bienvenue sur l'API Agents Python Assistant",
-        "version": "1.0.0",
-        "docs": "/docs",
-        "agents": orchestrator.get_registered_agents()
-    }
+    # La liste des agents sérialisée par l'orchestrateur n'est recalculée qu'après un
+    # enregistrement ou une suppression d'agent; la réponse complète suit le même cycle
+    agents_json = app.state.orchestrator.get_registered_agents_json()
+    if app.state.root_json is None or app.state.root_json[0] is not agents_json:
+        app.state.root_json = (agents_json, ROOT_JSON_PREFIX + agents_json + b"}")
+    return Response(app.state.root_json[1], media_type="application/json")
 
 @app.get("/agents", response_model=List[AgentInfoResponse])
 async def list_agents():
     """Liste tous les agents disponibles"""
-    return orchestrator.get_registered_agents()
+    return Response(app.state.orchestrator.get_registered_agents_json(), media_type="application/json")
 
 @app.post("/readme/generate")
 async def generate_readme(request: ReadmeRequest, background_tasks: BackgroundTasks):
     """Génère un README complet en Markdown pour un projet"""
     try:
-        result = await orchestrator.process_task("readme", request.dict())
+        result = await app.state.orchestrator.process_task("readme", request.model_dump(exclude_unset=True))
         
         if not result["success"]:
             raise HTTPException(status_code=500, detail=result["message"])
@@ -126,11 +253,16 @@ async def generate_readme(request: ReadmeRequest, background_tasks: BackgroundTa
         logger.error(f"Error in generate_readme: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/readme/generate/stream")
+async def generate_readme_stream(request: ReadmeRequest):
+    """Génère un README en transmettant le texte au fil de sa génération"""
+    return stream_task("readme", request.model_dump(exclude_unset=True))
+
 @app.post("/code/improve")
 async def improve_code(request: CodeRequest):
     """Améliore le code Python selon le type de tâche demandé"""
     try:
-        result = await orchestrator.process_task("code", request.dict())
+        result = await app.state.orchestrator.process_task("code", request.model_dump(exclude_unset=True))
         
         if not result["success"]:
             raise HTTPException(status_code=500, detail=result["message"])
@@ -141,11 +273,16 @@ async def improve_code(request: CodeRequest):
         logger.error(f"Error in improve_code: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/code/improve/stream")
+async def improve_code_stream(request: CodeRequest):
+    """Améliore le code Python en transmettant la réponse au fil de sa génération"""
+    return stream_task("code", request.model_dump(exclude_unset=True))
+
 @app.post("/code/debug")
 async def debug_code(request: DebugRequest):
     """Génère un rapport de debug pour un code Python"""
     try:
-        result = await code_assistant.generate_debug_report(
+        result = await app.state.code_assistant.generate_debug_report(
             request.code, 
             request.error_message
         )
@@ -163,7 +300,7 @@ async def debug_code(request: DebugRequest):
 async def analyze_debug(request: DebugRequest):
     """Analyse un code et génère un rapport de debug détaillé"""
     try:
-        result = await orchestrator.process_task("debug", request.dict())
+        result = await app.state.orchestrator.process_task("debug", request.model_dump(exclude_unset=True))
         
         if not result["success"]:
             raise HTTPException(status_code=500, detail=result["message"])
@@ -174,11 +311,17 @@ async def analyze_debug(request: DebugRequest):
         logger.error(f"Error in analyze_debug: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/debug/analyze/stream")
+async def analyze_debug_stream(request: DebugRequest):
+    """Analyse un code en transmettant le rapport au fil de sa génération"""
+    return stream_task("debug", request.model_dump(exclude_unset=True))
+
 @app.post("/rag/query")
 async def rag_query(request: RAGRequest):
     """Répond à une question en utilisant un document traité par RAG"""
     try:
-        result = await orchestrator.process_task("rag", request.dict())
+        await get_rag_agent()
+        result = await app.state.orchestrator.process_task("rag", request.model_dump(exclude_unset=True))
         
         if not result["success"]:
             raise HTTPException(status_code=500, detail=result["message"])
@@ -192,22 +335,22 @@ async def rag_query(request: RAGRequest):
 @app.post("/rag/process")
 async def process_document(file: UploadFile = File(...)):
     """Traite un document pour le RAG"""
+    # Le document est traité en mémoire: sa taille est bornée
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Document trop volumineux (maximum {MAX_UPLOAD_BYTES} octets)")
+    
     try:
-        # Sauvegarder temporairement le fichier
-        file_path = f"temp_{file.filename}"
-        with open(file_path, "wb") as temp_file:
-            content = await file.read()
-            temp_file.write(content)
+        from docling.datamodel.base_models import DocumentStream
+        
+        await get_rag_agent()
+        content = await file.read()
         
-        # Traiter le document
-        result = await orchestrator.process_task("rag", {
+        # Traiter le document directement depuis le contenu reçu, sans fichier temporaire
+        result = await app.state.orchestrator.process_task("rag", {
             "operation": "process",
-            "file_path": file_path
+            "source": DocumentStream(name=file.filename, stream=io.BytesIO(content))
         })
         
-        # Nettoyer le fichier temporaire
-        os.remove(file_path)
-        
         if not result["success"]:
             raise HTTPException(status_code=500, detail=result["message"])
         
@@ -220,21 +363,28 @@ async def process_document(file: UploadFile = File(...)):
 @app.get("/health")
 async def health_check():
     """Vérifie l'état de santé de l'API et des connecteurs LLM"""
-    ollama_status = await ollama_connector.check_status()
-    groq_status = groq_connector and await groq_connector.check_status()
+    # Les connecteurs sont interrogés en parallèle; l'échec d'un contrôle ne fait pas
+    # échouer l'endpoint, le connecteur concerné est simplement signalé indisponible
+    ollama_status, groq_status = await asyncio.gather(
+        app.state.ollama.check_status(),
+        app.state.groq.check_status() if app.state.groq else asyncio.sleep(0, result=False),
+        return_exceptions=True
+    )
+    ollama_status = ollama_status is True
+    groq_status = groq_status is True
     
     return {
         "status": "healthy" if ollama_status or groq_status else "degraded",
         "llm": {
             "ollama": {
-                "model": settings.OLLAMA_MODEL,
+                "model": OLLAMA_MODEL,
                 "status": "available" if ollama_status else "unavailable"
             },
             "groq": {
                 "status": "available" if groq_status else "unavailable"
             }
         },
-        "agents": orchestrator.get_registered_agents()
+        "agents": app.state.orchestrator.get_registered_agents()
     }
 
 if __name__ == "__main__":
@@ -2,7 +2,9 @@
 Agent orchestrateur qui coordonne les autres agents spécialisés
 """
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, AsyncIterator, Optional
+
+import orjson
 
 from agents.base_agent import BaseAgent
 
@@ -19,6 +21,8 @@ class Orchestrator:
         Initialise l'orchestrateur
         """
         self.agents: Dict[str, BaseAgent] = {}
+        # Liste des agents déjà sérialisée en JSON, recalculée après chaque modification
+        self._agents_json: Optional[bytes] = None
     
     def register_agent(self, agent_id: str, agent: BaseAgent) -> None:
         """
@@ -29,6 +33,7 @@ class Orchestrator:
             agent: Instance de l'agent à enregistrer
         """
         self.agents[agent_id] = agent
+        self._agents_json = None
         logger.info(f"Agent registered: {agent_id} ({agent.name})")
     
     def unregister_agent(self, agent_id: str) -> None:
@@ -40,6 +45,7 @@ class Orchestrator:
         """
         if agent_id in self.agents:
             del self.agents[agent_id]
+            self._agents_json = None
             logger.info(f"Agent unregistered: {agent_id}")
     
     def get_registered_agents(self) -> List[Dict[str, str]]:
@@ -54,6 +60,17 @@ class Orchestrator:
             for agent_id, agent in self.agents.items()
         ]
     
+    def get_registered_agents_json(self) -> bytes:
+        """
+        Renvoie la liste des agents enregistrés, sérialisée en JSON
+        
+        Returns:
+            Liste des agents au format JSON, mise en cache jusqu'au prochain enregistrement
+        """
+        if self._agents_json is None:
+            self._agents_json = orjson.dumps(self.get_registered_agents())
+        return self._agents_json
+    
     async def process_task(self, agent_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Délègue une tâche à l'agent approprié
@@ -76,7 +93,9 @@ class Orchestrator:
         try:
             agent = self.agents[agent_id]
             
-            if not agent.check_status():
+            # L'état est contrôlé au démarrage puis rafraîchi en tâche de fond: le
+            # contrôle réseau n'est fait ici que si aucun contrôle récent n'a réussi
+            if not agent.cached_status_ok() and not await agent.check_status():
                 logger.error(f"Agent {agent_id} is not available")
                 return {
                     "success": False,
@@ -100,3 +119,40 @@ class Orchestrator:
                 "message": f"Erreur lors du traitement: {str(e)}",
                 "result": None
             }
+
+    async def stream_task(self, agent_id: str, data: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Délègue une tâche à l'agent approprié en transmettant sa réponse au fil de l'eau
+        
+        Args:
+            agent_id: Identifiant de l'agent à utiliser
+            data: Données à traiter par l'agent
+            
+        Yields:
+            Événements produits par l'agent ({"delta": ...} puis {"result": ...})
+        """
+        if agent_id not in self.agents:
+            logger.error(f"Agent not found: {agent_id}")
+            yield {
+                "result": {
+                    "success": False,
+                    "message": f"Agent non trouvé: {agent_id}"
+                }
+            }
+            return
+        
+        agent = self.agents[agent_id]
+        
+        if not agent.cached_status_ok() and not await agent.check_status():
+            logger.error(f"Agent {agent_id} is not available")
+            yield {
+                "result": {
+                    "success": False,
+                    "message": f"Agent {agent_id} non disponible"
+                }
+            }
+            return
+        
+        logger.info(f"Streaming task from agent: {agent_id}")
+        async for event in agent.process_stream(data):
+            yield event
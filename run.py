@@ -1,29 +1,52 @@
 """
-Script to launch both the API server and the UI in separate processes
+Script to launch both the API server and the UI in the same process
 """
-import subprocess
-import sys
-import os
 import time
 from threading import Thread
 
-def run_api():
+import httpx
+import uvicorn
+
+API_URL = "http://localhost:8000"
+
+def run_api(server: uvicorn.Server):
     """Run the FastAPI server"""
     print("Starting API server...")
-    subprocess.run([sys.executable, "-m", "uvicorn", "main:app", "--reload", "--host", "0.0.0.0", "--port", "8000"])
+    server.run()
+
+def wait_for_api(timeout: float = 30.0) -> bool:
+    """Poll the API health endpoint with exponential backoff until it answers"""
+    deadline = time.monotonic() + timeout
+    delay = 0.1
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{API_URL}/health", timeout=0.5).status_code == 200:
+                return True
+        except httpx.HTTPError:
+            pass
+        time.sleep(delay)
+        delay = min(delay * 2, 2.0)
+    return False
 
 def run_ui():
     """Run the Gradio UI"""
     print("Waiting for API server to start...")
-    time.sleep(5)  # Give the API server time to start
+    if not wait_for_api():
+        print("API server is not responding, starting UI anyway...")
     print("Starting UI...")
-    subprocess.run([sys.executable, "-m", "utils.ui"])
+    from utils.ui import create_ui
+    create_ui().launch()
 
 if __name__ == "__main__":
+    # The server runs in this interpreter, so the API and the UI share the
+    # already imported modules (auto-reload requires a separate process)
+    config = uvicorn.Config("main:app", host="0.0.0.0", port=8000, reload=False)
+    server = uvicorn.Server(config)
+
     # Start the API server in a separate thread
-    api_thread = Thread(target=run_api)
+    api_thread = Thread(target=run_api, args=(server,))
     api_thread.daemon = True
     api_thread.start()
-    
+
     # Start the UI in the main thread
     run_ui()
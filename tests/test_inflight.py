@@ -0,0 +1,96 @@
+"""
+Tests for the coalescing of identical concurrent LLM calls
+"""
+import asyncio
+
+import pytest
+
+import agents.base_agent
+from agents.debug_assistant import DebugAssistant
+from llm.llm_connector import LLMConnector
+
+
+class GatedConnector(LLMConnector):
+    """
+    Connector counting its calls and holding every response until released
+    """
+
+    def __init__(self):
+        self.model_name = "fake"
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def generate(self, prompt, **kwargs):
+        self.calls += 1
+        call = self.calls
+        await self.release.wait()
+        return f"response {call}"
+
+    async def _probe_status(self):
+        return True
+
+
+@pytest.fixture(autouse=True)
+def no_semantic_cache(monkeypatch):
+    monkeypatch.setattr(agents.base_agent, "get_semantic_cache", lambda: None)
+
+
+def test_identical_concurrent_calls_share_one_llm_call():
+    async def scenario():
+        connector = GatedConnector()
+        agent = DebugAssistant(connector)
+        tasks = [asyncio.create_task(agent._cached_generate("prompt", None)) for _ in range(5)]
+        await asyncio.sleep(0)
+        connector.release.set()
+        return connector, await asyncio.gather(*tasks)
+
+    connector, results = asyncio.run(scenario())
+
+    assert connector.calls == 1
+    assert results == ["response 1"] * 5
+
+
+def test_waiting_calls_finish_when_the_leading_call_is_cancelled():
+    async def scenario():
+        connector = GatedConnector()
+        agent = DebugAssistant(connector)
+        leader = asyncio.create_task(agent._cached_generate("prompt", None))
+        await asyncio.sleep(0)
+        joiners = [asyncio.create_task(agent._cached_generate("prompt", None)) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        # Lets the waiting calls see the cancellation and retry before the LLM answers
+        await asyncio.sleep(0)
+
+        connector.release.set()
+        return connector, await asyncio.gather(*joiners)
+
+    connector, results = asyncio.run(scenario())
+
+    assert connector.calls == 2
+    assert results == ["response 2"] * 3
+
+
+def test_cancelling_a_waiting_call_raises_cancelled_error():
+    async def scenario():
+        connector = GatedConnector()
+        agent = DebugAssistant(connector)
+        leader = asyncio.create_task(agent._cached_generate("prompt", None))
+        await asyncio.sleep(0)
+        joiner = asyncio.create_task(agent._cached_generate("prompt", None))
+        await asyncio.sleep(0)
+
+        joiner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await joiner
+
+        connector.release.set()
+        return connector, await leader
+
+    connector, result = asyncio.run(scenario())
+
+    assert connector.calls == 1
+    assert result == "response 1"
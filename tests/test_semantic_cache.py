@@ -0,0 +1,151 @@
+"""
+Tests for the semantic cache of LLM responses
+"""
+import asyncio
+import zlib
+
+import numpy as np
+import pytest
+
+import agents.base_agent
+from agents.debug_assistant import DebugAssistant
+from agents.readme_generator import ReadmeGenerator
+from llm.llm_connector import LLMConnector
+import utils.semantic_cache
+from utils.semantic_cache import SemanticCache
+
+# Like all-MiniLM-L6-v2, the fake embedding model only sees the start of its input
+EMBED_WINDOW = 64
+EMBED_DIM = 384
+
+
+def fake_embed(self, key):
+    """
+    Bag-of-words embedding of the first EMBED_WINDOW words of a text
+    """
+    vector = np.zeros((1, EMBED_DIM), dtype=np.float32)
+    for word in key.split()[:EMBED_WINDOW]:
+        vector[0, zlib.crc32(word.encode()) % EMBED_DIM] += 1.0
+    return vector / np.linalg.norm(vector)
+
+
+class CountingConnector(LLMConnector):
+    """
+    Connector answering every prompt with a distinct text
+    """
+
+    def __init__(self):
+        self.model_name = "fake"
+        self.prompts = []
+
+    async def generate(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return f"# Response {len(self.prompts)}"
+
+    async def _probe_status(self):
+        return True
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(SemanticCache, "_embed_key", fake_embed)
+    cache = SemanticCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(agents.base_agent, "get_semantic_cache", lambda: cache)
+    return cache
+
+
+def readme_request(name, description):
+    return {
+        "project_name": name,
+        "project_description": description,
+        "technologies": ["Python", "FastAPI"]
+    }
+
+
+def test_readmes_for_different_projects_do_not_share_an_entry(cache):
+    connector = CountingConnector()
+    agent = ReadmeGenerator(connector)
+
+    first = asyncio.run(agent.process(readme_request("photo-sorter", "Sorts holiday photos by date and place")))
+    second = asyncio.run(agent.process(readme_request("invoice-bot", "Sends monthly invoices to customers by email")))
+
+    assert len(connector.prompts) == 2
+    assert first["content"] != second["content"]
+    assert cache.stats()["hits"] == 0
+
+
+def test_readmes_for_projects_differing_only_by_name_do_not_share_an_entry(cache):
+    connector = CountingConnector()
+    agent = ReadmeGenerator(connector)
+    description = "Sorts holiday photos by date and place"
+
+    first = asyncio.run(agent.process(readme_request("photo-sorter", description)))
+    second = asyncio.run(agent.process(readme_request("photo-organizer", description)))
+
+    assert len(connector.prompts) == 2
+    assert first["content"] != second["content"]
+    assert cache.stats()["hits"] == 0
+
+
+def test_identical_readme_request_is_served_from_cache(cache):
+    connector = CountingConnector()
+    agent = ReadmeGenerator(connector)
+    request = readme_request("photo-sorter", "Sorts holiday photos by date and place")
+
+    first = asyncio.run(agent.process(request))
+    second = asyncio.run(agent.process(request))
+
+    assert len(connector.prompts) == 1
+    assert first["content"] == second["content"]
+
+
+def test_exact_entries_only_match_identical_keys(cache):
+    cache.insert("return a + b", "addition", "code", exact=True)
+
+    assert cache.lookup("return a + b", "code", exact=True) == "addition"
+    assert cache.lookup("return a - b", "code", exact=True) is None
+    assert cache.lookup("return a + b", "debug", exact=True) is None
+
+
+def test_same_code_with_different_errors_does_not_share_an_entry(cache):
+    connector = CountingConnector()
+    agent = DebugAssistant(connector)
+    code = "def div(a, b):\n    return a / b\n"
+
+    asyncio.run(agent.process({"code": code, "error_message": "ZeroDivisionError: division by zero"}))
+    asyncio.run(agent.process({"code": code, "error_message": "TypeError: unsupported operand type(s)"}))
+
+    assert len(connector.prompts) == 2
+
+
+def test_oldest_entries_beyond_the_limit_are_purged(tmp_path, monkeypatch):
+    monkeypatch.setattr(SemanticCache, "_embed_key", fake_embed)
+    cache = SemanticCache(str(tmp_path / "cache.db"), max_entries=2)
+
+    for name in ["first", "second", "third"]:
+        cache.insert(f"{name} project", name, "readme")
+
+    assert cache.lookup("first project", "readme", exact=True) is None
+    assert cache.lookup("third project", "readme", exact=True) == "third"
+    assert cache.stats()["entries"] == 2
+
+
+def test_expired_entries_are_purged_on_insert(tmp_path, monkeypatch):
+    class Clock:
+        now = 1000.0
+
+        def time(self):
+            return self.now
+
+    clock = Clock()
+    monkeypatch.setattr(utils.semantic_cache, "time", clock)
+    monkeypatch.setattr(SemanticCache, "_embed_key", fake_embed)
+    cache = SemanticCache(str(tmp_path / "cache.db"), ttl=60)
+
+    cache.insert("old project", "old", "readme")
+    cache.insert("old code", "old", "code", exact=True)
+    clock.now += 120
+    cache.insert("new project", "new", "readme")
+
+    assert cache._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] == 1
+    assert cache.stats()["entries"] == 1
@@ -3,8 +3,10 @@ Module for document processing using Docling
 """
 import logging
 import os
-from typing import List, Dict, Any, Tuple
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple, Union
 
+from docling.datamodel.base_models import DocumentStream
 from docling.document_converter import DocumentConverter, ConversionResult
 from docling.chunking import HybridChunker
 from docling_core.transforms.chunker.tokenizer.huggingface import HuggingFaceTokenizer
@@ -12,6 +14,13 @@ from transformers import AutoTokenizer
 
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=4)
+def _load_tokenizer(model_id: str) -> AutoTokenizer:
+    """
+    Load a HuggingFace tokenizer once per model and reuse it afterwards
+    """
+    return AutoTokenizer.from_pretrained(model_id)
+
 class DoclingProcessor:
     """
     Document processor that uses Docling to extract and process documents.
@@ -29,36 +38,34 @@ class DoclingProcessor:
         
         # Initialize HuggingFace tokenizer for chunking
         self.tokenizer = HuggingFaceTokenizer(
-            tokenizer=AutoTokenizer.from_pretrained(embed_model_id),
+            tokenizer=_load_tokenizer(embed_model_id),
         )
         
         self.chunker = HybridChunker(tokenizer=self.tokenizer)
         logger.info(f"Initialized DoclingProcessor with model: {embed_model_id}")
     
-    def process_document(self, file_path: str) -> Tuple[ConversionResult, List[str]]:
+    def process_document(self, source: Union[str, DocumentStream]) -> Tuple[ConversionResult, List[str]]:
         """
-        Process a document file and split it into chunks
+        Process a document and split it into chunks
         
         Args:
-            file_path: Path to the document file
+            source: Path to the document file, or in-memory document stream
             
         Returns:
             Tuple containing the conversion result and a list of text chunks
         """
         try:
             # Convert the document
-            logger.info(f"Converting document: {file_path}")
-            result = self.converter.convert(file_path)
+            logger.info(f"Converting document: {getattr(source, 'name', source)}")
+            result = self.converter.convert(source)
             
             # Chunk the document
             logger.info("Chunking document...")
             chunk_iter = self.chunker.chunk(dl_doc=result.document)
             
             # Extract text from chunks
-            documents = []
-            for i, chunk in enumerate(chunk_iter):
-                enriched_text = self.chunker.contextualize(chunk=chunk)
-                documents.append(enriched_text)
+            contextualize = self.chunker.contextualize
+            documents = [contextualize(chunk=chunk) for chunk in chunk_iter]
                 
             logger.info(f"Document processed successfully: {len(documents)} chunks created")
             return result, documents
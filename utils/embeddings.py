@@ -0,0 +1,48 @@
+"""
+Module providing embedding models shared across the application
+"""
+import logging
+import threading
+from functools import lru_cache
+
+from langchain_community.embeddings import HuggingFaceEmbeddings
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Loading a HuggingFace model is not reentrant
+_LOAD_LOCK = threading.Lock()
+
+def get_embeddings(model_id: str) -> HuggingFaceEmbeddings:
+    """
+    Return the embedding model for the given ID, loading it only once per process
+    
+    Args:
+        model_id: ID of the sentence-transformers model
+        
+    Returns:
+        Shared embedding model instance
+    """
+    with _LOAD_LOCK:
+        return _load_embeddings(model_id)
+
+@lru_cache(maxsize=4)
+def _load_embeddings(model_id: str) -> HuggingFaceEmbeddings:
+    """
+    Load an embedding model (cached by get_embeddings)
+    """
+    model_kwargs = {}
+    
+    if settings.EMBEDDINGS_BACKEND == "onnx":
+        # Int8-quantized ONNX export run by ONNX Runtime instead of FP32 PyTorch
+        model_kwargs = {
+            "backend": "onnx",
+            "model_kwargs": {
+                "file_name": settings.EMBEDDINGS_ONNX_FILE,
+                "provider": "CPUExecutionProvider"
+            }
+        }
+    
+    logger.info(f"Loading embedding model: {model_id} ({settings.EMBEDDINGS_BACKEND} backend)")
+    return HuggingFaceEmbeddings(model_name=model_id, model_kwargs=model_kwargs)
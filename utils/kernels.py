@@ -0,0 +1,89 @@
+"""
+Module providing compiled numerical kernels for embedding similarity search
+"""
+import logging
+from typing import Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+    logger.warning("numba is not installed, falling back to NumPy similarity kernels")
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+        """
+        Normalize each row of a matrix to unit L2 norm
+        """
+        out = np.empty_like(vectors)
+        for i in prange(vectors.shape[0]):
+            norm = 0.0
+            for j in range(vectors.shape[1]):
+                norm += vectors[i, j] * vectors[i, j]
+            norm = np.sqrt(norm)
+            for j in range(vectors.shape[1]):
+                out[i, j] = vectors[i, j] / norm if norm > 0.0 else 0.0
+        return out
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _dot_scores(query: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+        """
+        Compute the dot product of a query with each row of a matrix
+        """
+        scores = np.empty(matrix.shape[0], dtype=np.float32)
+        for i in prange(matrix.shape[0]):
+            score = 0.0
+            for j in range(matrix.shape[1]):
+                score += query[j] * matrix[i, j]
+            scores[i] = score
+        return scores
+else:
+    def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+        """
+        Normalize each row of a matrix to unit L2 norm
+        """
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    def _dot_scores(query: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+        """
+        Compute the dot product of a query with each row of a matrix
+        """
+        return matrix @ query
+
+
+def cosine_topk(query: np.ndarray, matrix: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the rows of a matrix most similar to a query
+
+    Both the query and the rows must already be L2-normalized, so that the
+    dot product is the cosine similarity.
+
+    Args:
+        query: Query vector, of shape (d,)
+        matrix: Candidate vectors, of shape (n, d)
+        k: Number of results to return
+
+    Returns:
+        Tuple (row indices, cosine similarities), best match first
+    """
+    scores = _dot_scores(query, matrix)
+    k = min(k, scores.shape[0])
+    if k == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return top, scores[top]
+
+
+# Compile the kernels at import rather than on the first lookup
+_warmup = np.ones((2, 4), dtype=np.float32)
+cosine_topk(l2_normalize(_warmup)[0], l2_normalize(_warmup), 1)
+del _warmup
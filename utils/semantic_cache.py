@@ -0,0 +1,304 @@
+"""
+Module providing a semantic cache for LLM responses
+"""
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Below this number of entries, a compiled brute-force scan beats the FAISS search
+KERNEL_SEARCH_THRESHOLD = 1024
+
+def _hash_key(key: str) -> str:
+    """
+    Digest under which a key is stored and matched exactly
+    """
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+class SemanticCache:
+    """
+    Cache of LLM responses keyed on the user data of a request.
+
+    Callers pass a key built from the data the user supplied (not from the full
+    prompt, whose fixed instructions would dominate the embedding) and a
+    namespace identifying the agent and its generation parameters. An entry is
+    only reused within the same namespace: on an identical key, or, for
+    non-exact lookups, on a key whose normalized embedding lies within
+    `threshold` (squared L2 distance).
+
+    Expired entries, and the oldest entries beyond `max_entries`, are purged
+    at startup and after each insertion.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        embed_model_id: str = "sentence-transformers/all-MiniLM-L6-v2",
+        threshold: float = 0.15,
+        ttl: float = 3600.0,
+        max_entries: int = 10000
+    ):
+        """
+        Initialize the semantic cache
+
+        Args:
+            db_path: Path to the SQLite database storing the cached entries
+            embed_model_id: ID of the embedding model used to compare keys
+            threshold: Maximum distance for two keys to be considered equivalent
+            ttl: Lifetime of a cached entry, in seconds
+            max_entries: Maximum number of stored entries, the oldest are dropped first
+        """
+        self.db_path = db_path
+        self.embed_model_id = embed_model_id
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._embeddings = None
+        self._index = None
+        # Copy of the indexed vectors used by the brute-force scan on small caches
+        self._vectors = None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._lock = threading.Lock()
+        # A key is embedded once for the lookup and reused for the insertion
+        self._embed = lru_cache(maxsize=256)(self._embed_key)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                namespace TEXT NOT NULL,
+                key_hash TEXT NOT NULL,
+                response TEXT NOT NULL,
+                embedding BLOB,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_key ON entries (namespace, key_hash)")
+        self._conn.commit()
+        self._load_index()
+        logger.info(f"Initialized SemanticCache at {db_path}")
+
+    def lookup(self, key: str, namespace: str, exact: bool = False) -> Optional[str]:
+        """
+        Look for the response stored for an identical or equivalent key
+
+        Args:
+            key: User data of the request about to be sent to the LLM
+            namespace: Agent and generation parameters of the request
+            exact: If True, only an identical key is a hit
+
+        Returns:
+            The cached response, or None on a cache miss
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, response, created_at FROM entries WHERE namespace = ? AND key_hash = ? "
+                "ORDER BY id DESC LIMIT 1",
+                (namespace, _hash_key(key))
+            ).fetchone()
+            if row is not None:
+                row_id, response, created_at = row
+                if time.time() - created_at <= self.ttl:
+                    self.hits += 1
+                    return response
+                self._evict([row_id])
+
+        if exact or self._index is None or self._index.ntotal == 0:
+            self.misses += 1
+            return None
+
+        vector = self._embed(key)
+
+        with self._lock:
+            for distance, row_id in self._search(vector, 4):
+                if distance >= self.threshold:
+                    break
+
+                row = self._conn.execute(
+                    "SELECT namespace, response, created_at FROM entries WHERE id = ?",
+                    (row_id,)
+                ).fetchone()
+                if row is None:
+                    continue
+
+                cached_namespace, response, created_at = row
+                if time.time() - created_at > self.ttl:
+                    self._evict([row_id])
+                    continue
+
+                if cached_namespace == namespace:
+                    self.hits += 1
+                    return response
+
+            self.misses += 1
+            return None
+
+    def insert(self, key: str, response: str, namespace: str, exact: bool = False) -> None:
+        """
+        Store the response generated for a key
+
+        Args:
+            key: User data of the request sent to the LLM
+            response: Response generated by the LLM
+            namespace: Agent and generation parameters of the request
+            exact: If True, the entry is only matched on an identical key and is not embedded
+        """
+        vector = None if exact else self._embed(key)
+
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO entries (namespace, key_hash, response, embedding, created_at) VALUES (?, ?, ?, ?, ?)",
+                (namespace, _hash_key(key), response, None if vector is None else vector.tobytes(), time.time())
+            )
+            self._conn.commit()
+
+            if vector is not None:
+                self._add(vector, np.array([cursor.lastrowid], dtype=np.int64))
+
+            self._purge()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the hit/miss counters of the cache
+
+        Returns:
+            Dictionary with the number of hits, misses and stored entries
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": self._index.ntotal if self._index is not None else 0
+        }
+
+    def _load_index(self) -> None:
+        """
+        Drop expired and excess entries and index the remaining ones
+        """
+        self._purge()
+
+        rows = self._conn.execute("SELECT id, embedding FROM entries WHERE embedding IS NOT NULL").fetchall()
+        if not rows:
+            return
+
+        ids = np.array([row_id for row_id, _ in rows], dtype=np.int64)
+        vectors = np.vstack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows])
+
+        self._add(vectors, ids)
+        logger.info(f"Loaded {len(rows)} entries into the semantic cache")
+
+    def _purge(self) -> None:
+        """
+        Remove the expired entries, then the oldest ones beyond max_entries
+        """
+        expired = self._conn.execute(
+            "SELECT id FROM entries WHERE created_at < ?",
+            (time.time() - self.ttl,)
+        ).fetchall()
+        excess = self._conn.execute(
+            "SELECT id FROM entries ORDER BY id DESC LIMIT -1 OFFSET ?",
+            (self.max_entries,)
+        ).fetchall()
+
+        row_ids = sorted({row_id for row_id, in expired + excess})
+        if row_ids:
+            self._evict(row_ids)
+
+    def _evict(self, row_ids: List[int]) -> None:
+        """
+        Remove entries from the database and from the index
+        """
+        self._conn.executemany("DELETE FROM entries WHERE id = ?", [(row_id,) for row_id in row_ids])
+        self._conn.commit()
+
+        ids = np.array(row_ids, dtype=np.int64)
+        keep = ~np.isin(self._ids, ids)
+        if keep.all():
+            # Exact entries are not indexed
+            return
+
+        self._index.remove_ids(ids[np.isin(ids, self._ids)])
+        self._ids = self._ids[keep]
+        self._vectors = self._vectors[keep]
+
+    def _add(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        """
+        Add normalized vectors to the index under the given database IDs
+        """
+        if self._index is None:
+            # Imported lazily, like the kernels: importing faiss and compiling the numba
+            # kernels is only paid once the cache holds an embedded entry
+            import faiss
+            self._index = faiss.IndexIDMap(faiss.IndexFlatL2(vectors.shape[1]))
+            self._vectors = np.empty((0, vectors.shape[1]), dtype=np.float32)
+        self._index.add_with_ids(vectors, ids)
+
+        self._vectors = np.vstack([self._vectors, vectors])
+        self._ids = np.concatenate([self._ids, ids])
+
+    def _search(self, vector: np.ndarray, k: int) -> List[Tuple[float, int]]:
+        """
+        Find the entries closest to a normalized vector
+
+        Returns:
+            List of (squared L2 distance, database ID), closest first
+        """
+        if len(self._ids) < KERNEL_SEARCH_THRESHOLD:
+            from utils.kernels import cosine_topk
+            positions, scores = cosine_topk(vector[0], self._vectors, k)
+            # For unit vectors, the squared L2 distance is 2 - 2 * cosine
+            return [
+                (2.0 - 2.0 * float(score), int(self._ids[position]))
+                for position, score in zip(positions, scores)
+            ]
+
+        distances, ids = self._index.search(vector, min(k, self._index.ntotal))
+        return [
+            (float(distance), int(row_id))
+            for distance, row_id in zip(distances[0], ids[0])
+            if row_id != -1
+        ]
+
+    def _embed_key(self, key: str) -> np.ndarray:
+        """
+        Compute the normalized embedding of a key
+        """
+        if self._embeddings is None:
+            # Imported lazily: loading LangChain is only needed once the cache is used
+            from utils.embeddings import get_embeddings
+            self._embeddings = get_embeddings(self.embed_model_id)
+
+        from utils.kernels import l2_normalize
+
+        vector = np.asarray([self._embeddings.embed_query(key)], dtype=np.float32)
+        return l2_normalize(vector)
+
+
+@lru_cache(maxsize=1)
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """
+    Return the semantic cache shared by all agents
+
+    Returns:
+        The cache instance, or None if the cache is disabled in the settings
+    """
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return None
+
+    return SemanticCache(
+        settings.SEMANTIC_CACHE_PATH,
+        threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+        ttl=settings.SEMANTIC_CACHE_TTL,
+        max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES
+    )
@@ -1,14 +1,23 @@
 """
 Simple UI utilities for the agents system
 """
+import atexit
 import gradio as gr
-import requests
+import httpx
 import os
 import json
 
 # Configuration de l'API
 API_URL = "http://localhost:8000"
 
+# Client partagé par tous les boutons, pour réutiliser les connexions vers l'API
+_client = httpx.Client(
+    base_url=API_URL,
+    timeout=httpx.Timeout(300.0, connect=5.0),  # Les générations LLM peuvent être longues
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=100)
+)
+atexit.register(_client.close)
+
 def generate_readme(project_name, project_description, technologies, code_snippets, sections):
     """Generate a README using the API"""
     tech_list = [t.strip() for t in technologies.split(',') if t.strip()]
@@ -24,7 +33,7 @@ def generate_readme(project_name, project_description, technologies, code_snippe
         "include_sections": section_list
     }
     
-    response = requests.post(f"{API_URL}/readme/generate", json=data)
+    response = _client.post("/readme/generate", json=data)
     if response.status_code == 200:
         return response.json()
     else:
@@ -41,7 +50,7 @@ def improve_code(code, task_type, requirements, context):
         "context": context
     }
     
-    response = requests.post(f"{API_URL}/code/improve", json=data)
+    response = _client.post("/code/improve", json=data)
     if response.status_code == 200:
         result = response.json()
         return result["improved_code"], result["explanation"]
@@ -55,7 +64,7 @@ def debug_code(code, error_message):
         "error_message": error_message
     }
     
-    response = requests.post(f"{API_URL}/code/debug", json=data)
+    response = _client.post("/code/debug", json=data)
     if response.status_code == 200:
         result = response.json()
         return result["debug_report"], result["fixed_code"]
@@ -67,8 +76,8 @@ def process_document(file):
     if not file:
         return "No file provided"
     
-    files = {"file": (os.path.basename(file), open(file, "rb"))}
-    response = requests.post(f"{API_URL}/rag/process", files=files)
+    with open(file, "rb") as f:
+        response = _client.post("/rag/process", files={"file": (os.path.basename(file), f)})
     
     if response.status_code == 200:
         result = response.json()
@@ -84,7 +93,7 @@ def query_document(query, index_path=None):
         "operation": "query"
     }
     
-    response = requests.post(f"{API_URL}/rag/query", json=data)
+    response = _client.post("/rag/query", json=data)
     
     if response.status_code == 200:
         result = response.json()